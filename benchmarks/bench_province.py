@@ -0,0 +1,128 @@
+"""省份提取基准测试：逐行 apply 与去重 + 关键词哈希表解析的对比
+
+用法：
+    python benchmarks/bench_province.py                # 默认 10万、100万行
+    python benchmarks/bench_province.py --rows 100000 1000000 --unique 8000
+
+合成数据模拟多年面板：企业数量固定，每个企业名称在各年份重复出现。
+两种方法的结果会逐行比对，不一致时以非零状态退出。
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.province import ProvinceResolver  # noqa: E402
+
+
+def legacy_extract_province(company_name):
+    """改造前的实现：每次调用都重建字典并线性扫描关键词"""
+    if not company_name or pd.isna(company_name):
+        return "未知"
+    provinces = {
+        '北京': ['北京', '京'],
+        '上海': ['上海', '沪', '浦发'],
+        '广东': ['广东', '粤', '深圳', '广州', '东莞', '佛山', '珠海'],
+        '江苏': ['江苏', '苏', '南京', '苏州', '无锡', '常州'],
+        '浙江': ['浙江', '浙', '杭州', '宁波', '温州', '绍兴'],
+        '山东': ['山东', '鲁', '青岛', '济南', '烟台', '淄博'],
+        '河北': ['河北', '冀', '石家庄', '唐山', '邯郸'],
+        '河南': ['河南', '豫', '郑州', '洛阳'],
+        '湖北': ['湖北', '鄂', '武汉', '黄石', '十堰'],
+        '湖南': ['湖南', '湘', '长沙', '株洲', '湘潭'],
+        '四川': ['四川', '川', '蜀', '成都', '绵阳'],
+        '陕西': ['陕西', '陕', '秦', '西安', '宝鸡'],
+        '安徽': ['安徽', '皖', '合肥', '芜湖'],
+        '福建': ['福建', '闽', '福州', '厦门'],
+        '江西': ['江西', '赣', '南昌', '九江'],
+        '广西': ['广西', '桂', '南宁', '柳州'],
+        '云南': ['云南', '滇', '昆明'],
+        '贵州': ['贵州', '黔', '贵阳'],
+        '辽宁': ['辽宁', '辽', '沈阳', '大连'],
+        '吉林': ['吉林', '吉', '长春'],
+        '黑龙江': ['黑龙江', '黑', '哈尔滨'],
+        '天津': ['天津', '津'],
+        '重庆': ['重庆', '渝'],
+        '山西': ['山西', '晋', '太原'],
+        '内蒙古': ['内蒙古', '蒙', '呼和浩特'],
+        '西藏': ['西藏', '藏', '拉萨'],
+        '新疆': ['新疆', '疆', '乌鲁木齐'],
+        '青海': ['青海', '青', '西宁'],
+        '甘肃': ['甘肃', '甘', '陇', '兰州'],
+        '宁夏': ['宁夏', '宁', '银川'],
+        '海南': ['海南', '琼', '海口', '三亚']
+    }
+    special_cases = {
+        '东北': '辽宁',
+        '西南': '四川',
+        '华北': '北京',
+        '华东': '上海',
+        '华南': '广东',
+        '华中': '湖北'
+    }
+    for key, province in special_cases.items():
+        if key in company_name:
+            return province
+    for province, keywords in provinces.items():
+        for keyword in keywords:
+            if keyword in company_name:
+                return province
+    return "未知"
+
+
+# 合成企业名称的字库：包含省份关键词的前缀和不含关键词的前缀
+_PREFIXES = ['浦发', '东北', '华南', '深圳', '杭州', '青岛', '成都', '武汉', '西安', '合肥',
+             '厦门', '昆明', '大连', '长春', '哈尔滨', '重庆', '太原', '乌鲁木齐', '三亚', '银川',
+             '中国', '天融', '思特', '安恒', '东方', '恒瑞', '光明', '万科', '格力', '美的']
+_MIDDLES = ['科技', '信息', '电子', '医药', '能源', '化工', '机械', '智能', '数据', '通信', '']
+_SUFFIXES = ['股份', '集团', '控股', '实业', '发展', '']
+
+
+def make_company_names(n_rows, n_unique, seed=42):
+    """生成 n_rows 行、约 n_unique 个不同企业名称的合成列"""
+    rng = np.random.default_rng(seed)
+    pool = []
+    for i in range(n_unique):
+        name = (rng.choice(_PREFIXES) + rng.choice(_MIDDLES) + rng.choice(_SUFFIXES)
+                + str(i % 97 if i >= len(_PREFIXES) else ''))
+        pool.append(name)
+    names = np.array(pool, dtype=object)[rng.integers(0, n_unique, size=n_rows)]
+    return pd.Series(names, name='企业名称')
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def run(rows, n_unique):
+    print(f'{"行数":>10} {"逐行apply(s)":>14} {"去重解析(s)":>12} {"加速比":>8}')
+    ok = True
+    for n_rows in rows:
+        names = make_company_names(n_rows, n_unique)
+        legacy, legacy_time = _timed(lambda: names.apply(legacy_extract_province))
+        # 每轮使用新的解析器，计入关键词表编译和名称去重的开销
+        fast, fast_time = _timed(lambda: ProvinceResolver().resolve_series(names))
+        same = bool((legacy.to_numpy() == fast.to_numpy()).all())
+        ok &= same
+        print(f'{n_rows:>10} {legacy_time:>14.3f} {fast_time:>12.3f} '
+              f'{legacy_time / fast_time:>7.1f}x{"" if same else "  结果不一致!"}')
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='省份提取基准测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--unique', type=int, default=8000, help='不同企业名称的数量')
+    args = parser.parse_args(argv)
+    return 0 if run(args.rows, args.unique) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
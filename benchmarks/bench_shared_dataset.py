@@ -0,0 +1,129 @@
+"""共享数据集基准测试：st.cache_data 的逐次反序列化与 st.cache_resource 共享只读对象的对比
+
+用法：
+    python benchmarks/bench_shared_dataset.py                       # 默认 30 个会话、每种方式 50 次重新运行
+    python benchmarks/bench_shared_dataset.py --sessions 60 --reruns 100 --data 合并后的数字化转型指数数据.xlsx
+
+st.cache_data 把返回值序列化保存，每次命中都用 pickle 反序列化出一份新副本；这里
+直接模拟这一过程（copy），与所有会话共享同一个对象（shared）比较：
+
+- 重新运行延迟：取得数据集 + 执行一组典型筛选与聚合（年份、行业、趋势、排名）；
+- 常驻内存：--sessions 个会话同时持有各自数据集时进程 RSS 的增量。
+
+每种方式在独立的子进程中运行，避免互相影响内存统计。RSS 需要安装 psutil。
+"""
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.dataset import IndexDataset  # noqa: E402
+from utils.filter_plan import FilterPlan  # noqa: E402
+
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖
+    psutil = None
+
+MODES = ('copy', 'shared')
+
+
+def rss_mb():
+    if psutil is None:
+        return float('nan')
+    return psutil.Process().memory_info().rss / 1024 / 1024
+
+
+def page_queries(dataset):
+    """模拟一次页面重新运行中的主要查询"""
+    years = dataset.filters.values('年份')
+    industries = dataset.filters.values('行业名称')
+    plan = FilterPlan(dataset, {'年份': years[-5:], '行业名称': industries[:3]})
+    columns = ['年份', '行业名称']
+    plan.frame('数据概览', columns)
+    plan.average('年度趋势', '年份', columns)
+    plan.average('省份对比', '省份', columns)
+    plan.ranking('企业排名', columns, 20)
+
+
+def run_mode(mode, data_path, sessions, reruns):
+    dataset = IndexDataset.from_path(data_path)
+    payload = pickle.dumps(dataset, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def get_dataset():
+        if mode == 'copy':
+            return pickle.loads(payload)
+        return dataset
+
+    # 重新运行延迟
+    get_dataset()
+    fetch_times, rerun_times = [], []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        current = get_dataset()
+        current.df
+        fetched = time.perf_counter()
+        page_queries(current)
+        fetch_times.append(fetched - start)
+        rerun_times.append(time.perf_counter() - start)
+        del current
+
+    # 多个会话同时持有数据集时的内存
+    baseline = rss_mb()
+    held = [get_dataset() for _ in range(sessions)]
+    for current in held:
+        current.df
+    peak = rss_mb()
+    del held
+
+    return {
+        'mode': mode,
+        'rows': len(dataset),
+        'pickle_mb': len(payload) / 1024 / 1024,
+        'fetch_ms_median': float(np.median(fetch_times) * 1000),
+        'rerun_ms_median': float(np.median(rerun_times) * 1000),
+        'rerun_ms_p95': float(np.percentile(rerun_times, 95) * 1000),
+        'sessions': sessions,
+        'rss_delta_mb': peak - baseline,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='合并后的数字化转型指数数据.xlsx', help='数据工作簿路径')
+    parser.add_argument('--sessions', type=int, default=30, help='同时在线的会话数')
+    parser.add_argument('--reruns', type=int, default=50, help='每种方式测量的重新运行次数')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.data, args.sessions, args.reruns)))
+        return 0
+
+    results = []
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--mode', mode, '--data', args.data,
+             '--sessions', str(args.sessions), '--reruns', str(args.reruns)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f'{"方式":<8}{"数据集获取(ms)":>16}{"重新运行中位数(ms)":>20}{"p95(ms)":>10}'
+          f'{f"{args.sessions}个会话RSS增量(MB)":>22}')
+    for result in results:
+        print(f'{result["mode"]:<8}{result["fetch_ms_median"]:>16.2f}{result["rerun_ms_median"]:>20.2f}'
+              f'{result["rerun_ms_p95"]:>10.2f}{result["rss_delta_mb"]:>22.1f}')
+    print(f'数据 {results[0]["rows"]} 行，序列化后 {results[0]["pickle_mb"]:.1f} MB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""冷启动基准：两个入口的导入耗时分解与首屏时间，超出预算时以非零状态退出
+
+用法：
+    python benchmarks/bench_startup.py                          # 每个入口冷启动 3 次取中位数，按 STARTUP_BUDGET_MS 检查
+    python benchmarks/bench_startup.py --repeat 5 --budget app=3000 cli=800 --output startup.json
+
+每次测量都启动一个新的 Python 进程（-X importtime），相当于容器冷启动后的第一次请求
+（操作系统的文件缓存是热的，真实冷启动还要加上读磁盘的时间）：
+
+- app：用 Streamlit 的 AppTest 无头运行 dt_index_deploy.py 直到首屏渲染完成
+  （包括导入、加载数据和绘制全部图表），不需要浏览器；
+- cli：digital_transformation_index.py 处理一个不存在的输入文件，在读取文件时报错退出，
+  衡量命令行每次调用的固定启动开销。
+
+导入耗时取 -X importtime 中顶层导入的累计时间，按顶层包汇总，列出最慢的若干个。
+任一入口的中位数超过预算时退出码为 1，可直接用于 CI。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'dt_index_deploy.py')
+CLI_PATH = os.path.join(ROOT, 'digital_transformation_index.py')
+
+ENTRY_POINTS = ('app', 'cli')
+# 冷启动预算（毫秒，各次测量的中位数）；可用 --budget 覆盖
+STARTUP_BUDGET_MS = {'app': 3000, 'cli': 1000}
+DEFAULT_REPEAT = 3
+TOP_PACKAGES = 10
+
+# 在子进程中运行页面直到首屏渲染完成，输出页面脚本本身的耗时
+APP_DRIVER = '''
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=float(sys.argv[2]))
+at.run()
+if at.exception:
+    sys.exit(f'页面运行出错: {at.exception[0].value}')
+print(json.dumps({'script_ms': (time.perf_counter() - start) * 1000}))
+'''
+
+
+def parse_importtime(stderr):
+    """按顶层包汇总 -X importtime 输出中顶层导入的累计耗时（毫秒）"""
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # 表头
+        name = fields[2]
+        # 嵌套导入的名称前有更多缩进，已计入其上层导入的累计时间
+        if len(name) - len(name.lstrip()) != 1:
+            continue
+        packages[name.strip().split('.')[0]] += int(fields[1]) / 1000
+    return dict(packages)
+
+
+def measure(entry, timeout):
+    """冷启动一次，返回 {'total_ms', 'import_ms', 'packages', ...}"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    with tempfile.TemporaryDirectory() as tmp:
+        if entry == 'app':
+            command = [sys.executable, '-X', 'importtime', '-c', APP_DRIVER, APP_PATH, str(timeout)]
+        else:
+            command = [sys.executable, '-X', 'importtime', CLI_PATH,
+                       os.path.join(tmp, '不存在.xlsx'), '--output-dir', os.path.join(tmp, 'out')]
+        start = time.perf_counter()
+        completed = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout)
+        total_ms = (time.perf_counter() - start) * 1000
+    if entry == 'app' and completed.returncode != 0:
+        messages = [line for line in completed.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError('\n'.join(messages[-5:]))
+    packages = parse_importtime(completed.stderr)
+    result = {'total_ms': total_ms, 'import_ms': sum(packages.values()), 'packages': packages}
+    if entry == 'app':
+        result['script_ms'] = json.loads(completed.stdout.strip().splitlines()[-1])['script_ms']
+    return result
+
+
+def summarize(entry, runs, budget_ms):
+    """各次测量取中位数，并与预算比较"""
+    summary = {
+        'entry': entry,
+        'runs': len(runs),
+        'total_ms': round(float(np.median([run['total_ms'] for run in runs])), 1),
+        'import_ms': round(float(np.median([run['import_ms'] for run in runs])), 1),
+        'budget_ms': budget_ms,
+    }
+    if entry == 'app':
+        summary['first_page_script_ms'] = round(float(np.median([run['script_ms'] for run in runs])), 1)
+    names = set().union(*(run['packages'] for run in runs))
+    packages = {name: float(np.median([run['packages'].get(name, 0.0) for run in runs])) for name in names}
+    summary['packages'] = {name: round(ms, 1) for name, ms in sorted(packages.items(), key=lambda item: -item[1])}
+    summary['over_budget'] = budget_ms is not None and summary['total_ms'] > budget_ms
+    return summary
+
+
+def parse_budgets(items):
+    budgets = dict(STARTUP_BUDGET_MS)
+    for item in items or ():
+        entry, _, value = item.partition('=')
+        if entry not in ENTRY_POINTS or not value:
+            raise argparse.ArgumentTypeError(f'预算格式应为 入口=毫秒（入口: {", ".join(ENTRY_POINTS)}）: {item}')
+        budgets[entry] = float(value)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', nargs='+', choices=ENTRY_POINTS, default=list(ENTRY_POINTS), help='要测量的入口')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='每个入口冷启动的次数（取中位数）')
+    parser.add_argument('--budget', nargs='+', metavar='入口=毫秒', help='覆盖默认预算，如 app=3000 cli=800')
+    parser.add_argument('--timeout', type=float, default=300, help='单次冷启动的超时时间（秒）')
+    parser.add_argument('--top', type=int, default=TOP_PACKAGES, help='列出导入最慢的包的个数')
+    parser.add_argument('--output', help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+    try:
+        budgets = parse_budgets(args.budget)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    summaries = []
+    for entry in args.entries:
+        runs = []
+        for i in range(args.repeat):
+            try:
+                runs.append(measure(entry, args.timeout))
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                print(f'{entry} 第 {i + 1} 次冷启动失败: {e}', file=sys.stderr)
+                return 1
+            print(f'{entry} 第 {i + 1} 次: {runs[-1]["total_ms"]:.0f} ms', file=sys.stderr)
+        summaries.append(summarize(entry, runs, budgets.get(entry)))
+
+    for summary in summaries:
+        status = '超出预算' if summary['over_budget'] else '通过'
+        line = f'{summary["entry"]}: 冷启动 {summary["total_ms"]:.0f} ms（预算 {summary["budget_ms"]:.0f} ms，{status}），导入 {summary["import_ms"]:.0f} ms'
+        if 'first_page_script_ms' in summary:
+            line += f'，页面脚本首次运行 {summary["first_page_script_ms"]:.0f} ms'
+        print(line)
+        for name, ms in list(summary['packages'].items())[:args.top]:
+            print(f'    {name:<24}{ms:>10.1f} ms')
+
+    if args.output:
+        report = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'parameters': {'repeat': args.repeat},
+            'results': summaries,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'结果已写入 {args.output}')
+    return 1 if any(summary['over_budget'] for summary in summaries) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,475 @@
+"""合成数据基准测试套件：指数计算流程与分析平台各阶段的耗时和内存
+
+用法：
+    python benchmarks/bench_suite.py                                   # 默认 1万、10万、100万、1000万行
+    python benchmarks/bench_suite.py --rows 10000 100000 --output bench.json
+    python benchmarks/bench_suite.py --rows 100000 --compare bench.json   # 与上次结果对比
+    python benchmarks/bench_suite.py --rows 100000 --runs 3 --compare bench.json --min-delta-ms 20
+
+合成数据由固定种子生成，列结构与真实数据一致（股票代码、企业名称、年份、行业代码、行业名称、
+五个“*词频数”列），企业名称带省份关键词，企业在各年份重复出现。每个规模在独立的子进程中
+依次运行以下阶段，记录耗时和进程 RSS 峰值（RSS 需要安装 psutil）：
+
+- generate：生成词频表
+- pca_fit / pca_score：清洗、标准化与 PCA 拟合；用拟合出的模型重新评分（不重新拟合）
+- export：把合并面板写成 --export-format 格式（默认 parquet，xlsx 超过行数上限时自动改用 parquet）
+- load：读回导出的面板
+- province / prepare：企业名称解析省份；完整的派生列与紧凑类型转换
+- cache_write / cache_read：写入、读取 Parquet 数据缓存
+- index_build：构建筛选位图、预聚合立方体、排名索引等查询结构
+- filter / aggregate / ranking / figures：典型侧边栏筛选、分组均值与分布、排名分页、
+  与页面同类的 Plotly 图表构建及序列化（取 --repeat 次的中位数）。省份地图与页面相同，
+  用 --geo-dir（默认 geo/）中的本地省界 GeoJSON 按显示范围选择级别绘制；没有省界文件时
+  页面不绘制地图，这里也跳过，结果中的 parameters.map 为 false，两种结果之间的 figures 不可比
+
+计时开始前先导入并预热各阶段延迟导入的库（sklearn、Plotly，导出为 xlsx 时还有 openpyxl），
+各阶段的耗时不包含一次性的导入开销（导入开销见 bench_startup.py）。
+
+结果以 JSON 输出，包含运行环境与 git 版本，可用 --compare 与之前的结果逐阶段对比：
+变慢超过 --threshold（比例）且绝对增加超过 --min-delta-ms（毫秒）的阶段计为变慢，
+有这样的阶段时以非零状态退出。毫秒级的阶段单看比例容易被噪声误判，用 --runs 让每个规模
+在多个独立子进程中各运行一次，逐阶段取中位数（只运行一次的阶段也因此有多个样本）。内存峰值大致与行数成正比（100万行约 0.7 GB），
+1000万行需要相应的内存。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from digital_transformation_index import (  # noqa: E402
+    MERGED_COLUMNS, clean_keyword_table, compute_index, tech_columns,
+)
+from utils.china_geo import (  # noqa: E402
+    GEO_DIR, MAP_HEIGHT_PX, MAP_WIDTH_PX, PROVINCE_PINYIN, available_levels, feature_bounds, load_provinces,
+    pick_level, visible_span,
+)
+from utils.data_cache import write_cache  # noqa: E402
+from utils.dataset import IndexDataset, prepare_frame  # noqa: E402
+from utils.province import PROVINCE_KEYWORDS, resolve_provinces  # noqa: E402
+from utils.writers import EXCEL_MAX_ROWS, OUTPUT_FORMATS, write_tables  # noqa: E402
+
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖
+    psutil = None
+
+DEFAULT_ROWS = (10_000, 100_000, 1_000_000, 10_000_000)
+DEFAULT_SEED = 20240601
+YEARS = tuple(range(2011, 2024))
+
+# 行业代码与名称（取自证监会行业分类中的常见行业）
+INDUSTRIES = (
+    ('C39', '计算机、通信和其他电子设备制造业'),
+    ('I65', '软件和信息技术服务业'),
+    ('C27', '医药制造业'),
+    ('C26', '化学原料和化学制品制造业'),
+    ('C38', '电气机械和器材制造业'),
+    ('C35', '专用设备制造业'),
+    ('C34', '通用设备制造业'),
+    ('C36', '汽车制造业'),
+    ('J66', '货币金融服务'),
+    ('J67', '资本市场服务'),
+    ('K70', '房地产业'),
+    ('F51', '批发业'),
+    ('F52', '零售业'),
+    ('D44', '电力、热力生产和供应业'),
+    ('G54', '道路运输业'),
+    ('E48', '土木工程建筑业'),
+    ('B06', '煤炭开采和洗选业'),
+    ('C15', '酒、饮料和精制茶制造业'),
+    ('I64', '互联网和相关服务'),
+    ('R86', '广播、电视、电影和录音制作业'),
+)
+NAME_PARTS = ('华', '中', '国', '金', '信', '通', '科', '达', '新', '兴', '恒', '泰', '天', '长', '海', '宏',
+              '光', '明', '瑞', '安', '盛', '博', '联', '创')
+NAME_SUFFIXES = ('科技股份有限公司', '集团股份有限公司', '电子股份有限公司', '医药股份有限公司',
+                 '银行股份有限公司', '能源股份有限公司', '智能股份有限公司', '实业股份有限公司')
+# 五个词频列的相对权重
+KEYWORD_SHARES = (0.15, 0.2, 0.15, 0.05, 0.45)
+
+# 对比时判定为变慢的最小绝对增加（毫秒）
+DEFAULT_MIN_DELTA_MS = 10.0
+
+STAGES = ('generate', 'pca_fit', 'pca_score', 'export', 'load', 'province', 'prepare',
+          'cache_write', 'cache_read', 'index_build', 'filter', 'aggregate', 'ranking', 'figures')
+
+
+def synthetic_keywords(rows, seed=DEFAULT_SEED, years=YEARS):
+    """按固定种子生成 rows 行的年报词频表（企业 × 年份，随机缺少部分企业年份）"""
+    rng = np.random.default_rng(seed)
+    n_years = len(years)
+    n_firms = max(1, -(-rows // n_years))
+    # 约 5% 的企业年份缺失，多生成一些企业后再抽取 rows 个
+    n_firms = int(n_firms / 0.95) + 1
+
+    codes = pd.Series(rng.choice(999_999, n_firms, replace=False) + 1).astype(str).str.zfill(6)
+    provinces = [keywords[0] for keywords in PROVINCE_KEYWORDS.values()]
+    # 八成企业名称带省份关键词
+    prefix = np.where(rng.random(n_firms) < 0.8, np.array(provinces, dtype=object)[rng.integers(len(provinces), size=n_firms)], '')
+    parts = np.array(NAME_PARTS, dtype=object)
+    names = (pd.Series(prefix) + parts[rng.integers(len(parts), size=n_firms)]
+             + parts[rng.integers(len(parts), size=n_firms)]
+             + np.array(NAME_SUFFIXES, dtype=object)[rng.integers(len(NAME_SUFFIXES), size=n_firms)])
+    industry = rng.integers(len(INDUSTRIES), size=n_firms)
+    # 企业的数字化程度（对数正态）及逐年增长
+    intensity = rng.lognormal(mean=1.5, sigma=1.2, size=n_firms)
+
+    cells = np.sort(rng.choice(n_firms * n_years, size=rows, replace=rows > n_firms * n_years))
+    firm, year = np.divmod(cells, n_years)
+    growth = 1.12 ** year
+    df = pd.DataFrame({
+        '股票代码': codes.to_numpy()[firm],
+        '企业名称': names.to_numpy()[firm],
+        '年份': np.asarray(years)[year],
+    })
+    for column, share in zip(tech_columns, KEYWORD_SHARES):
+        df[column] = rng.poisson(intensity[firm] * growth * share * 10)
+    df['行业代码'] = np.array([code for code, _ in INDUSTRIES], dtype=object)[industry[firm]]
+    df['行业名称'] = np.array([name for _, name in INDUSTRIES], dtype=object)[industry[firm]]
+    return df
+
+
+def synthetic_plan_states(dataset):
+    """与分析平台典型操作对应的几组筛选条件"""
+    years = dataset.values('年份')
+    industries = dataset.values('行业名称')
+    provinces = [p for p in dataset.values('省份') if p != '未知']
+    return [
+        {'年份': years[-1:]},
+        {'年份': years[-3:], '行业名称': industries[:2]},
+        {'年份': years[-1:], '省份': provinces[:3]},
+        {'年份': [], '行业名称': industries[:1], '省份': provinces[:2]},
+        {'年份': years[-1:], '企业名称': ['科技', '银行']},
+        {'年份': years[-2:], '股票代码': ['600', '300', '000001']},
+    ]
+
+
+FILTER_COLUMNS = ['年份', '行业名称', '省份', '企业名称', '股票代码']
+
+
+def run_filters(dataset, states):
+    for state in states:
+        dataset.plan(state).frame('数据概览', FILTER_COLUMNS)
+
+
+def run_aggregates(dataset, states):
+    for state in states:
+        plan = dataset.plan(state)
+        plan.histogram('指数分布', FILTER_COLUMNS)
+        plan.average('年度趋势', '年份', ['行业名称', '省份', '企业名称', '股票代码'])
+        plan.average('行业对比', '行业名称', ['年份', '省份'])
+        plan.average('省份对比', '省份', ['年份', '行业名称'])
+
+
+def run_ranking(dataset, states):
+    for state in states:
+        plan = dataset.plan(state)
+        plan.ranking_frame('企业排名', FILTER_COLUMNS, 20, 0)
+        plan.ranking_frame('企业排名', FILTER_COLUMNS, 20, 20 * 49)
+
+
+def load_geo(geo_dir):
+    """读取各级省界（页面中每个进程只读取一次，不计入图表耗时）；没有省界文件时返回 None"""
+    levels = available_levels(geo_dir)
+    if not levels:
+        return None
+    geojsons = {level: load_provinces(level, geo_dir) for level in levels}
+    return {'dir': geo_dir, 'geojsons': geojsons, 'bounds': feature_bounds(geojsons[levels[0]])}
+
+
+def map_figure(averages, geo):
+    """与 dt_index_deploy.build_map_figure 相同的省份地图：本地省界 GeoJSON，按显示范围选择级别"""
+    data = averages[averages['省份'] != '未知'].copy()
+    data['Province_EN'] = data['省份'].map(PROVINCE_PINYIN)
+    data = data.dropna(subset=['Province_EN'])
+    span = visible_span(geo['bounds'], data['Province_EN'], MAP_WIDTH_PX, MAP_HEIGHT_PX)
+    figure = px.choropleth(data, geojson=geo['geojsons'][pick_level(MAP_WIDTH_PX, span, geo['dir'])],
+                           featureidkey='properties.name', locations='Province_EN',
+                           color='数字化转型指数(0-100分)', hover_name='省份', range_color=[0, 100])
+    figure.update_geos(fitbounds='locations', visible=False)
+    return figure
+
+
+def run_figures(dataset, states, geo=None):
+    """构建与页面同类的图表（分布柱状图、趋势折线图、Top10 柱状图，有省界文件时还有省份地图）并序列化"""
+    for state in states:
+        plan = dataset.plan(state)
+        counts = plan.histogram('指数分布', FILTER_COLUMNS)
+        figures = [
+            px.bar(pd.DataFrame({'指数': np.arange(len(counts)), '企业数量': counts}), x='指数', y='企业数量'),
+            px.line(plan.average('年度趋势', '年份', ['行业名称', '省份', '企业名称', '股票代码']),
+                    x='年份', y='数字化转型指数(0-100分)', markers=True),
+        ]
+        for by, columns in (('行业名称', ['年份', '省份']), ('省份', ['年份', '行业名称'])):
+            top = plan.average(by, by, columns).nlargest(10, '数字化转型指数(0-100分)')
+            figures.append(px.bar(top, x=by, y='数字化转型指数(0-100分)', color='数字化转型指数(0-100分)'))
+        if geo is not None:
+            figures.append(map_figure(plan.average('地理分布', '省份', ['行业名称', '企业名称', '股票代码']), geo))
+        for figure in figures:
+            figure.to_json()
+
+
+class PeakRss:
+    """后台线程每隔 interval 秒采样一次进程 RSS，记录期间的峰值（MB）"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = float('nan')
+        self._process = psutil.Process() if psutil is not None else None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current(self):
+        if self._process is None:
+            return float('nan')
+        return self._process.memory_info().rss / 1024 / 1024
+
+    def __enter__(self):
+        self.peak = self.current()
+        if self._process is not None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+        self.peak = max(self.peak, self.current())
+        return False
+
+
+def warm_up(export_format, geo=None):
+    """在计时前导入并预热各阶段延迟导入的库：用小数据走一遍 PCA 拟合和各类图表的构建与序列化"""
+    df_cleaned, technical_columns = clean_keyword_table(synthetic_keywords(200), log=lambda message: None)
+    compute_index(df_cleaned, technical_columns, log=lambda message: None)
+    sample = pd.DataFrame({'省份': ['北京', '上海'], '数字化转型指数(0-100分)': [1.0, 2.0]})
+    figures = [px.bar(sample, x='省份', y='数字化转型指数(0-100分)', color='数字化转型指数(0-100分)'),
+               px.line(sample, x='省份', y='数字化转型指数(0-100分)', markers=True)]
+    if geo is not None:
+        figures.append(map_figure(sample, geo))
+    for figure in figures:
+        figure.to_json()
+    if export_format == 'xlsx':
+        import openpyxl  # noqa: F401
+
+
+def run_size(rows, seed, repeat, export_format, geo_dir=GEO_DIR):
+    """在当前进程中依次运行各阶段，返回该规模的结果"""
+    stages = {}
+    geo = load_geo(geo_dir)
+    warm_up(export_format, geo)
+
+    def measure(name, func, repeats=1):
+        times = []
+        with PeakRss() as rss:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                result = func()
+                times.append(time.perf_counter() - start)
+        stages[name] = {
+            'seconds': float(np.median(times)),
+            'peak_rss_mb': round(rss.peak, 1),
+        }
+        if repeats > 1:
+            stages[name]['repeats'] = repeats
+        return result
+
+    keywords = measure('generate', lambda: synthetic_keywords(rows, seed))
+
+    def fit():
+        df_cleaned, technical_columns = clean_keyword_table(keywords, log=lambda message: None)
+        _, _, result_df, model = compute_index(df_cleaned, technical_columns, log=lambda message: None)
+        return df_cleaned, result_df, model
+
+    df_cleaned, result_df, model = measure('pca_fit', fit)
+    measure('pca_score', lambda: model.score(df_cleaned))
+    panel = result_df[MERGED_COLUMNS]
+    del keywords, df_cleaned
+
+    fmt = export_format
+    if fmt == 'xlsx' and len(panel) > EXCEL_MAX_ROWS:
+        fmt = 'parquet'
+    with tempfile.TemporaryDirectory() as tmp:
+        path, _ = measure('export', lambda: write_tables(os.path.join(tmp, 'panel'), [('Sheet1', panel)], fmt))
+        readers = {'xlsx': pd.read_excel, 'parquet': pd.read_parquet, 'csv': pd.read_csv}
+        raw = measure('load', lambda: readers[fmt](path, dtype={'股票代码': str}) if fmt == 'csv' else readers[fmt](path))
+        del panel, result_df
+
+        measure('province', lambda: resolve_provinces(raw['企业名称']))
+        df = measure('prepare', lambda: prepare_frame(raw.copy()))
+        cache_path = os.path.join(tmp, 'panel.cache.parquet')
+        measure('cache_write', lambda: write_cache(df, cache_path, {'version': 0}))
+        df = measure('cache_read', lambda: pd.read_parquet(cache_path))
+    del raw
+
+    dataset = measure('index_build', lambda: IndexDataset(df))
+    states = synthetic_plan_states(dataset)
+    measure('filter', lambda: run_filters(dataset, states), repeat)
+    measure('aggregate', lambda: run_aggregates(dataset, states), repeat)
+    measure('ranking', lambda: run_ranking(dataset, states), repeat)
+    measure('figures', lambda: run_figures(dataset, states, geo), repeat)
+
+    return {
+        'rows': rows,
+        'export_format': fmt,
+        'map': geo is not None,
+        'stages': stages,
+        'total_seconds': round(sum(stage['seconds'] for stage in stages.values()), 4),
+        'max_rss_mb': round(max(stage['peak_rss_mb'] for stage in stages.values()), 1),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def print_results(results):
+    header = f'{"阶段":<14}' + ''.join(f'{result["rows"]:>14,}' for result in results)
+    print(header + '   (秒 / 峰值RSS MB)')
+    for stage in STAGES:
+        cells = []
+        for result in results:
+            entry = result['stages'].get(stage)
+            cells.append(f'{entry["seconds"]:>8.3f}/{entry["peak_rss_mb"]:<5.0f}' if entry else f'{"-":>14}')
+        print(f'{stage:<14}' + ''.join(f'{cell:>14}' for cell in cells))
+
+
+def merge_runs(runs):
+    """同一规模多次运行的结果：各阶段耗时取中位数，内存峰值取最大值"""
+    stages = {}
+    for stage in STAGES:
+        entries = [run['stages'][stage] for run in runs if stage in run['stages']]
+        if not entries:
+            continue
+        stages[stage] = dict(entries[0])
+        stages[stage]['seconds'] = float(np.median([entry['seconds'] for entry in entries]))
+        stages[stage]['peak_rss_mb'] = max(entry['peak_rss_mb'] for entry in entries)
+        stages[stage]['runs'] = len(entries)
+    return {
+        **runs[0],
+        'runs': len(runs),
+        'stages': stages,
+        'total_seconds': round(sum(stage['seconds'] for stage in stages.values()), 4),
+        'max_rss_mb': round(max(stage['peak_rss_mb'] for stage in stages.values()), 1),
+    }
+
+
+def compare_results(baseline, results, threshold, min_delta_ms=0.0):
+    """逐阶段对比耗时，返回变慢超过 threshold（比例）且绝对增加超过 min_delta_ms（毫秒）的阶段数"""
+    previous = {result['rows']: result for result in baseline['results']}
+    print(f'\n与 {baseline["environment"].get("commit")}（{baseline["environment"].get("timestamp")}）对比：')
+    regressions = 0
+    for result in results:
+        old = previous.get(result['rows'])
+        if old is None:
+            print(f'{result["rows"]:,} 行：基准结果中没有该规模')
+            continue
+        skip = set()
+        if old.get('map', False) != result.get('map', False):
+            # 一边包含省份地图、一边不包含时 figures 阶段不可比
+            print(f'{result["rows"]:,} 行：两次运行是否绘制省份地图不同，跳过 figures 阶段')
+            skip.add('figures')
+        for stage in STAGES:
+            if stage in skip or stage not in result['stages'] or stage not in old['stages']:
+                continue
+            before = old['stages'][stage]['seconds']
+            after = result['stages'][stage]['seconds']
+            change = (after - before) / before if before else 0.0
+            flag = ''
+            if change > threshold and (after - before) * 1000 > min_delta_ms:
+                flag = '  <-- 变慢'
+                regressions += 1
+            print(f'{result["rows"]:>12,} {stage:<14}{before:>10.4f}s -> {after:>10.4f}s {change:>+8.1%}{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=list(DEFAULT_ROWS), help='各次运行的行数')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='合成数据的随机种子')
+    parser.add_argument('--repeat', type=int, default=5, help='筛选、聚合、排名和图表阶段的重复次数（取中位数）')
+    parser.add_argument('--export-format', choices=OUTPUT_FORMATS, default='parquet', help='export 阶段的输出格式')
+    parser.add_argument('--output', help='把结果写入 JSON 文件')
+    parser.add_argument('--compare', help='与之前输出的 JSON 结果对比')
+    parser.add_argument('--threshold', type=float, default=0.1, help='对比时判定为变慢的比例（默认 0.1）')
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help=f'对比时判定为变慢的最小绝对增加（毫秒，默认 {DEFAULT_MIN_DELTA_MS:g}），避免毫秒级阶段的噪声')
+    parser.add_argument('--runs', type=int, default=1, help='每个规模在独立子进程中运行的次数（各阶段取中位数）')
+    parser.add_argument('--geo-dir', default=GEO_DIR, help='figures 阶段省份地图使用的省界目录（默认 geo/，没有时跳过地图）')
+    parser.add_argument('--single', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        print(json.dumps(run_size(args.rows[0], args.seed, args.repeat, args.export_format, args.geo_dir)))
+        return 0
+
+    if not available_levels(args.geo_dir):
+        print(f'{args.geo_dir} 中没有省界文件，figures 阶段不包含省份地图（与页面一致）', file=sys.stderr)
+
+    results = []
+    for rows in args.rows:
+        # 每个规模在独立的子进程中运行，避免互相影响内存统计
+        runs = []
+        for _ in range(max(args.runs, 1)):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--single', '--rows', str(rows), '--seed', str(args.seed),
+                 '--repeat', str(args.repeat), '--export-format', args.export_format, '--geo-dir', args.geo_dir],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        results.append(merge_runs(runs) if len(runs) > 1 else runs[0])
+        print(f'完成 {rows:,} 行，共 {results[-1]["total_seconds"]:.1f} 秒', file=sys.stderr)
+
+    report = {
+        'environment': environment(),
+        'parameters': {'seed': args.seed, 'repeat': args.repeat, 'runs': args.runs,
+                       'export_format': args.export_format, 'map': bool(available_levels(args.geo_dir))},
+        'results': results,
+    }
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'结果已写入 {args.output}')
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare_results(baseline, results, args.threshold, args.min_delta_ms):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
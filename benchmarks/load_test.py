@@ -0,0 +1,284 @@
+"""多会话并发负载测试：用 Streamlit 的 AppTest 在进程内无头运行 dt_index_deploy.py
+
+用法：
+    python benchmarks/load_test.py                                  # 默认 1、5、10、20 个并发会话
+    python benchmarks/load_test.py --sessions 1 10 40 --steps 15 --output load.json
+
+每个模拟会话是一个独立的 AppTest（相当于一个浏览器标签页），在各自的线程中回放一串随机
+但可复现（--seed）的操作：选择年份、多选行业、多选省份、粘贴股票代码列表（含 .SH / SZ 等
+写法）、搜索企业名称、排名表翻页、清空筛选。筛选在侧边栏表单中设置后点击“应用筛选”提交，
+与真实使用一致。同一进程中的会话共享 st.cache_resource（数据集、图表缓存），与部署时相同。
+
+对每个并发数报告：重新运行延迟的 p50 / p95 / p99、吞吐量（所有会话每秒完成的重新运行次数）
+以及进程 RSS（开始、峰值、结束，需要 psutil）。不需要浏览器或网络。
+
+注意：AppTest 每次都运行整个脚本，排名翻页在浏览器中只重新运行排名区块，这里测得的是上限。
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'dt_index_deploy.py')
+
+try:
+    import psutil
+except ImportError:  # psutil 为可选依赖
+    psutil = None
+
+DEFAULT_SESSIONS = (1, 5, 10, 20)
+DEFAULT_STEPS = 10
+DEFAULT_SEED = 7
+APPLY_LABEL = '应用筛选'
+NAME_TERMS = ('科技', '银行', '电子', '医药', '集团', '能源', '智能', '证券')
+CODE_PREFIXES = ('600', '000', '300', '002', '688')
+STEP_KINDS = ('years', 'industries', 'provinces', 'codes', 'names', 'page', 'reset')
+
+
+def rss_mb():
+    if psutil is None:
+        return float('nan')
+    return psutil.Process().memory_info().rss / 1024 / 1024
+
+
+def find_widget(widgets, label):
+    for widget in widgets:
+        if widget.label.startswith(label):
+            return widget
+    raise LookupError(f'页面上没有“{label}”控件')
+
+
+class Catalog:
+    """从预热会话的页面上读取可选的年份、行业、省份以及排名表中的股票代码和企业名称"""
+
+    def __init__(self, at):
+        self.years = list(find_widget(at.multiselect, '选择年份').options)
+        self.industries = list(find_widget(at.multiselect, '选择行业').options)
+        self.provinces = [p for p in find_widget(at.multiselect, '选择省份').options if p != '未知']
+        ranking = at.dataframe[0].value if len(at.dataframe) else None
+        self.codes = list(ranking['股票代码'].astype(str)) if ranking is not None else []
+        names = list(ranking['企业名称'].astype(str)) if ranking is not None else []
+        # 企业名称中的两字片段，模拟按简称搜索
+        self.name_terms = list(NAME_TERMS) + [name[:2] for name in names if len(name) >= 2]
+
+
+def random_codes(rng, catalog):
+    """模拟从 Excel 粘贴的一串股票代码：混用纯代码、交易所后缀 / 前缀写法和前缀"""
+    codes = []
+    for _ in range(rng.randint(3, 8)):
+        choice = rng.random()
+        if catalog.codes and choice < 0.6:
+            code = rng.choice(catalog.codes)
+            exchange = 'SH' if code.startswith('6') else 'SZ'
+            code = rng.choice([code, f'{code}.{exchange}', f'{exchange}{code}'])
+        else:
+            code = rng.choice(CODE_PREFIXES)
+        codes.append(code)
+    return ', '.join(codes)
+
+
+def make_steps(rng, catalog, count):
+    """一个会话的操作序列：(类型, 参数)"""
+    steps = []
+    for _ in range(count):
+        kind = rng.choice(STEP_KINDS)
+        if kind == 'years':
+            value = sorted(rng.sample(catalog.years, rng.randint(1, min(3, len(catalog.years)))))
+        elif kind == 'industries':
+            value = rng.sample(catalog.industries, rng.randint(1, min(3, len(catalog.industries))))
+        elif kind == 'provinces':
+            value = rng.sample(catalog.provinces, rng.randint(1, min(3, len(catalog.provinces))))
+        elif kind == 'codes':
+            value = random_codes(rng, catalog)
+        elif kind == 'names':
+            value = ','.join(rng.sample(catalog.name_terms, rng.randint(1, 2)))
+        elif kind == 'page':
+            value = rng.randint(2, 5)
+        else:
+            value = None
+        steps.append((kind, value))
+    return steps
+
+
+def apply_step(at, kind, value):
+    """在页面上执行一步操作（尚未重新运行）"""
+    if kind == 'page':
+        if not len(at.number_input):
+            return
+        # 超出页数时页面会把页码收回到最后一页
+        at.number_input(key='ranking_page').set_value(value)
+        return
+    if kind == 'years':
+        find_widget(at.multiselect, '选择年份').set_value(value)
+    elif kind == 'industries':
+        find_widget(at.multiselect, '选择行业').set_value(value)
+    elif kind == 'provinces':
+        find_widget(at.multiselect, '选择省份').set_value(value)
+    elif kind == 'codes':
+        find_widget(at.text_input, '股票代码').input(value)
+    elif kind == 'names':
+        find_widget(at.text_input, '企业名称').input(value)
+    elif kind == 'reset':
+        find_widget(at.multiselect, '选择行业').set_value([])
+        find_widget(at.multiselect, '选择省份').set_value([])
+        find_widget(at.text_input, '股票代码').input('')
+        find_widget(at.text_input, '企业名称').input('')
+    find_widget(at.button, APPLY_LABEL).click()
+
+
+def allow_concurrent_apptests():
+    """让多个 AppTest 可以在不同线程中同时运行
+
+    AppTest 每次运行前把一个模拟的 Runtime 设为全局单例，运行结束后清除；多个会话并发时，
+    先结束的运行会把仍在运行的会话的 Runtime 清掉。这里让单例被清除后仍返回最近一次设置的
+    实例，并在整个测试期间固定打开 global.appTest 选项（AppTest 运行时会临时设置并恢复它）。
+    """
+    from streamlit import config
+    from streamlit.runtime import Runtime
+
+    config.set_option('global.appTest', True)
+    latest = {}
+
+    def instance(cls):
+        if cls._instance is not None:
+            latest['runtime'] = cls._instance
+        elif 'runtime' not in latest:
+            raise RuntimeError("Runtime hasn't been created!")
+        return latest['runtime']
+
+    def exists(cls):
+        return cls._instance is not None or 'runtime' in latest
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+def new_session(timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.run()
+    if at.exception:
+        raise RuntimeError(f'页面运行出错: {at.exception[0].value}')
+    return at
+
+
+def run_level(sessions, steps, seed, catalog, timeout):
+    """sessions 个会话同时回放各自的操作序列，返回延迟、吞吐量和内存统计"""
+    # 会话的首次运行（打开页面）不计入延迟
+    apps = [new_session(timeout) for _ in range(sessions)]
+    plans = [make_steps(random.Random(seed * 1000 + i), catalog, steps) for i in range(sessions)]
+    latencies = [[] for _ in range(sessions)]
+    errors = []
+    barrier = threading.Barrier(sessions + 1)
+    rss_start = rss_mb()
+    rss_peak = rss_start
+    done = threading.Event()
+
+    def sample_rss():
+        nonlocal rss_peak
+        while not done.wait(0.01):
+            rss_peak = max(rss_peak, rss_mb())
+
+    def worker(i):
+        at = apps[i]
+        barrier.wait()
+        for kind, value in plans[i]:
+            try:
+                apply_step(at, kind, value)
+                start = time.perf_counter()
+                at.run()
+                latencies[i].append(time.perf_counter() - start)
+                if at.exception:
+                    errors.append(f'会话 {i} {kind}: {at.exception[0].value}')
+            except Exception as e:
+                errors.append(f'会话 {i} {kind}: {e}')
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(sessions)]
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    for thread in threads:
+        thread.start()
+    sampler.start()
+    barrier.wait()
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+    done.set()
+    sampler.join()
+
+    flat = np.array([latency for session in latencies for latency in session]) * 1000
+    result = {
+        'sessions': sessions,
+        'reruns': int(len(flat)),
+        'errors': len(errors),
+        'wall_seconds': round(wall, 3),
+        'throughput_per_s': round(len(flat) / wall, 2) if wall else None,
+        'rss_start_mb': round(rss_start, 1),
+        'rss_peak_mb': round(max(rss_peak, rss_mb()), 1),
+        'rss_end_mb': round(rss_mb(), 1),
+    }
+    if len(flat):
+        result.update({
+            'p50_ms': round(float(np.percentile(flat, 50)), 1),
+            'p95_ms': round(float(np.percentile(flat, 95)), 1),
+            'p99_ms': round(float(np.percentile(flat, 99)), 1),
+            'max_ms': round(float(flat.max()), 1),
+        })
+    for message in errors[:5]:
+        print(message, file=sys.stderr)
+    del apps
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=list(DEFAULT_SESSIONS), help='依次测试的并发会话数')
+    parser.add_argument('--steps', type=int, default=DEFAULT_STEPS, help='每个会话回放的操作数')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='操作序列的随机种子')
+    parser.add_argument('--timeout', type=float, default=120, help='单次重新运行的超时时间（秒）')
+    parser.add_argument('--output', help='把结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    # 页面按相对路径查找数据文件
+    os.chdir(ROOT)
+    allow_concurrent_apptests()
+    start = time.perf_counter()
+    warmup = new_session(args.timeout)
+    print(f'预热完成（加载数据与首次渲染 {time.perf_counter() - start:.1f} 秒），RSS {rss_mb():.0f} MB', file=sys.stderr)
+    catalog = Catalog(warmup)
+    del warmup
+
+    results = []
+    for sessions in args.sessions:
+        results.append(run_level(sessions, args.steps, args.seed, catalog, args.timeout))
+        print(f'完成 {sessions} 个并发会话', file=sys.stderr)
+
+    print(f'{"会话数":>6}{"重新运行":>10}{"p50(ms)":>10}{"p95(ms)":>10}{"p99(ms)":>10}'
+          f'{"吞吐量(次/秒)":>14}{"RSS峰值(MB)":>13}{"错误":>6}')
+    for result in results:
+        print(f'{result["sessions"]:>6}{result["reruns"]:>10}{result.get("p50_ms", float("nan")):>10.1f}'
+              f'{result.get("p95_ms", float("nan")):>10.1f}{result.get("p99_ms", float("nan")):>10.1f}'
+              f'{result["throughput_per_s"] or 0:>14.2f}{result["rss_peak_mb"]:>13.1f}{result["errors"]:>6}')
+
+    if args.output:
+        report = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'parameters': {'steps': args.steps, 'seed': args.seed},
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'结果已写入 {args.output}')
+    return 1 if any(result['errors'] for result in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,108 +1,182 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
 import os
 import platform
 import subprocess
 from datetime import datetime
+import argparse
+import glob
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils.index_model import IndexModel, StreamingIndexFitter, iter_table_chunks
+from utils.stock_code import normalize_stock_codes
+from utils.writers import OUTPUT_FORMATS, format_stats, write_tables
 
 # ==============================================
 # 数字化转型指数计算主程序（新手友好版）
+#
+# 直接运行时按原流程处理 2013 年数据；传入文件、目录或通配符时进入批处理模式：
+#     python digital_transformation_index.py 年报词频/ --output-dir 结果/
+#     python digital_transformation_index.py "年报词频/*年年报技术关键词统计.xlsx" --workers 4
+# 数据量超出内存时可加 --streaming，把所有输入合并成一个数据流分块计算：
+#     python digital_transformation_index.py 年报词频/ --streaming --chunksize 100000
+# 拟合一次并保存模型，之后用同一模型为新年份评分（不再重新拟合，各年指数尺度一致）：
+#     python digital_transformation_index.py 年报词频/ --streaming --save-model 指数模型.json
+#     python digital_transformation_index.py 2024年年报技术关键词统计.xlsx --model 指数模型.json
+# 结果供程序读取时可用 --format parquet 或 csv 代替 Excel，写出更快、文件更小（合并面板始终为 Excel）
+# 批处理模式不等待输入、不打开文件，退出码：0 全部成功，1 部分年份失败，2 参数错误或没有输入文件
 # ==============================================
 
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+required_columns = ['股票代码', '企业名称']
+tech_columns = ['人工智能词频数', '大数据词频数', '云计算词频数', '区块链词频数', '数字技术运用词频数']
+# 不参与计算的标识列（股票代码、企业名称、年份、行业）
+exclude_columns = required_columns + ['年份', '行业名称', '行业代码']
+
+MERGED_FILENAME = '合并后的数字化转型指数数据.xlsx'
+# 合并面板是分析平台的数据文件，不受 --format 影响，始终写成平台读取的 Excel 格式
+MERGED_FORMAT = 'xlsx'
+# 合并面板的列顺序，与 dt_index_deploy.py 读取的格式一致
+MERGED_COLUMNS = ['股票代码', '年份', '企业名称', '数字化转型指数(0-100分)', '总词频数', '行业代码', '行业名称']
+
+# 目录输入时识别的文件类型
+INPUT_EXTENSIONS = ('.xlsx', '.csv', '.parquet')
+
+# 流式模式每次读取的行数及输出文件名（不含扩展名，由输出格式决定）
+DEFAULT_CHUNKSIZE = 50000
+STREAMING_RESULT_NAME = '数字化转型指数结果'
+STREAMING_WEIGHTS_NAME = '主成分权重'
+
+# 结果表的默认输出格式：批处理沿用 Excel，流式模式数据量大，默认 CSV
+DEFAULT_BATCH_FORMAT = 'xlsx'
+DEFAULT_STREAMING_FORMAT = 'csv'
+
+
+class IndexInputError(Exception):
+    """输入数据无法用于计算指数"""
+
+
 # ----------------------
 # 1. 读取数据文件
 # ----------------------
-print('正在读取2013年年报词频统计数据...')
-file_path = '2013年年报技术关键词统计.xlsx'
-
-try:
-    df = pd.read_excel(file_path)
-    print(f'成功读取文件: {file_path}')
+def read_keyword_table(file_path):
+    """读取年报词频统计表（xlsx，批处理时也支持 csv / parquet），并把股票代码统一为6位数格式"""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == '.csv':
+        df = pd.read_csv(file_path)
+    elif ext == '.parquet':
+        df = pd.read_parquet(file_path)
+    else:
+        df = pd.read_excel(file_path)
     # 确保股票代码为6位数格式
     if '股票代码' in df.columns:
         # 对非'未知'的股票代码进行处理，确保为6位数格式
-        df['股票代码'] = df['股票代码'].apply(lambda x: str(x).zfill(6) if isinstance(x, (str, int)) and str(x) != '未知' and len(str(x)) < 6 else x)
-except Exception as e:
-    print(f'错误：无法读取文件: {str(e)}')
-    input('按回车键退出...')
-    exit()
+        df['股票代码'] = normalize_stock_codes(df['股票代码'])
+    return df
 
-if df is None:
-    print('错误：无法读取文件，请检查文件是否存在')
-    input('按回车键退出...')
-    exit()
 
 # ----------------------
 # 2. 数据清洗与验证
 # ----------------------
-print('正在验证数据格式...')
-required_columns = ['股票代码', '企业名称']
-missing_columns = [col for col in required_columns if col not in df.columns]
+def clean_keyword_table(df, log=print):
+    """校验必要列并删除不完整记录，返回清洗后的数据和参与计算的技术指标列"""
+    log('正在验证数据格式...')
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        raise IndexInputError(f'数据缺少必要的列: {missing_columns}')
 
-if missing_columns:
-    print(f'错误：数据缺少必要的列: {missing_columns}')
-    input('按回车键退出...')
-    exit()
+    # 检查技术关键词列是否存在
+    missing_tech_cols = [col for col in tech_columns if col not in df.columns]
+    if missing_tech_cols:
+        log(f'警告：缺少以下技术关键词列: {missing_tech_cols}，将忽略这些指标')
 
-# 检查技术关键词列是否存在
-tech_columns = ['人工智能词频数', '大数据词频数', '云计算词频数', '区块链词频数', '数字技术运用词频数']
-missing_tech_cols = [col for col in tech_columns if col not in df.columns]
-if missing_tech_cols:
-    print(f'警告：缺少以下技术关键词列: {missing_tech_cols}，将忽略这些指标')
+    initial_count = len(df)
+    # 只删除技术关键词列中有缺失值的行
+    present_tech_columns = [col for col in tech_columns if col in df.columns]
+    df_cleaned = df.dropna(subset=present_tech_columns + required_columns)
+    deleted_count = initial_count - len(df_cleaned)
+    log(f'数据清洗完成：共 {initial_count} 条记录，删除 {deleted_count} 条不完整记录')
+    if df_cleaned.empty:
+        raise IndexInputError('清洗后没有可用于计算的记录')
+
+    # 排除非技术列（股票代码、企业名称、年份、行业）
+    technical_columns = [col for col in df.columns if col not in exclude_columns]
+    return df_cleaned, technical_columns
 
-initial_count = len(df)
-# 只删除技术关键词列中有缺失值的行
-tech_columns = [col for col in tech_columns if col in df.columns]
-df_cleaned = df.dropna(subset=tech_columns + required_columns)
-deleted_count = initial_count - len(df_cleaned)
-print(f'数据清洗完成：共 {initial_count} 条记录，删除 {deleted_count} 条不完整记录')
 
 # ----------------------
 # 3. 数据标准化与PCA分析
+# 4. 指数计算
 # ----------------------
-# 排除非技术列（股票代码、企业名称、年份）
-required_columns = ['股票代码', '企业名称']
-exclude_columns = required_columns + ['年份']
-technical_columns = [col for col in df.columns if col not in exclude_columns]
+def compute_index(df_cleaned, technical_columns, log=print):
+    """标准化、PCA 确定权重并计算0-100分指数，返回 (标准化数据, 权重, 指数结果表, 指数模型)"""
+    # sklearn 导入较慢（约 1 秒），只在真正需要拟合时导入，读取文件失败、用已保存的模型评分等路径不加载
+    from sklearn.decomposition import PCA
+    from sklearn.preprocessing import StandardScaler
 
-print(f'将用于计算的技术指标: {technical_columns}')
-X = df_cleaned[technical_columns].values
+    log(f'将用于计算的技术指标: {technical_columns}')
+    X = df_cleaned[technical_columns].values
 
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
 
-pca = PCA()
-pca.fit(X_scaled)
-cumulative_variance = np.cumsum(pca.explained_variance_ratio_)
-n_components = np.argmax(cumulative_variance >= 0.85) + 1
-print(f'选择 {n_components} 个主成分，累计解释方差比例: {cumulative_variance[n_components-1]:.2%}')
+    pca = PCA()
+    pca.fit(X_scaled)
+    explained_variance_ratio = pca.explained_variance_ratio_
+    cumulative_variance = np.cumsum(explained_variance_ratio)
+    n_components = np.argmax(cumulative_variance >= 0.85) + 1
+    log(f'选择 {n_components} 个主成分，累计解释方差比例: {cumulative_variance[n_components-1]:.2%}')
 
-pca = PCA(n_components=n_components)
-principal_components = pca.fit_transform(X_scaled)
-weights = np.sum(np.abs(pca.components_), axis=0)
-weights = weights / np.sum(weights)
+    pca = PCA(n_components=n_components)
+    pca.fit(X_scaled)
+    weights = np.sum(np.abs(pca.components_), axis=0)
+    weights = weights / np.sum(weights)
 
-# ----------------------
-# 4. 指数计算
-# ----------------------
-index_values = np.dot(X_scaled, weights)
-normalized_index = ((index_values - index_values.min()) / (index_values.max() - index_values.min()) * 100).round().astype(int)
+    index_values = np.dot(X_scaled, weights)
+    normalized_index = ((index_values - index_values.min()) / (index_values.max() - index_values.min()) * 100).round().astype(int)
 
-result_df = df_cleaned[required_columns + ['年份']].copy()
-result_df['数字化转型指数(0-100分)'] = normalized_index
+    result_df = build_result_table(df_cleaned, technical_columns, normalized_index)
+    model = IndexModel(technical_columns, scaler.mean_, scaler.scale_, n_components, weights,
+                       index_values.min(), index_values.max(),
+                       explained_variance_ratio=explained_variance_ratio, n_samples=len(X))
+    return X_scaled, weights, result_df, model
+
+
+def score_with_model(df_cleaned, model):
+    """用已保存的模型评分（不重新拟合），返回 (标准化数据, 指数结果表)"""
+    try:
+        normalized_index = model.score(df_cleaned)
+    except ValueError as e:
+        raise IndexInputError(str(e))
+    X_scaled = model.standardize(df_cleaned[model.technical_columns].values)
+    return X_scaled, build_result_table(df_cleaned, model.technical_columns, normalized_index)
+
+
+def build_result_table(df_cleaned, technical_columns, normalized_index):
+    """组装指数结果表：标识列、指数、原始词频、总词频数及行业信息"""
+    result_df = df_cleaned[required_columns + ['年份']].copy()
+    result_df['数字化转型指数(0-100分)'] = normalized_index
+
+    # 添加原始词频数据和总词频数
+    for col in technical_columns:
+        result_df[col] = df_cleaned[col]
+    result_df['总词频数'] = df_cleaned[technical_columns].sum(axis=1)
+
+    # 保留行业信息，便于合并成分析平台使用的面板
+    for col in ['行业代码', '行业名称']:
+        if col in df_cleaned.columns:
+            result_df[col] = df_cleaned[col]
+    return result_df
 
-# 添加原始词频数据和总词频数
-for col in technical_columns:
-    result_df[col] = df_cleaned[col]
-result_df['总词频数'] = df_cleaned[technical_columns].sum(axis=1)
 
 # ----------------------
 # 5. 保存结果（含错误处理）
 # ----------------------
-print('正在保存结果文件...')
-
 def get_unique_filename(base_name):
     """生成唯一文件名，避免覆盖和权限问题"""
     if not os.path.exists(base_name):
@@ -112,44 +186,339 @@ def get_unique_filename(base_name):
     name, ext = os.path.splitext(base_name)
     return f"{name}_{timestamp}{ext}"
 
-try:
-    # 尝试保存文件，如遇权限问题则生成唯一文件名
-    output_file = get_unique_filename('2013年数字化转型指数结果表.xlsx')
-    
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        df_cleaned.to_excel(writer, sheet_name='1_原始数据', index=False)
-        pd.DataFrame(X_scaled, columns=technical_columns).to_excel(writer, sheet_name='2_标准化数据', index=False)
-        pd.DataFrame({'指标名称': technical_columns, '权重值': weights}).to_excel(writer, sheet_name='3_主成分权重', index=False)
-        result_df.to_excel(writer, sheet_name='4_指数结果', index=False)
-    
-    print(f'结果已成功保存至: {os.path.abspath(output_file)}')
-    
-    # 尝试自动打开文件
+
+def save_results(output_stem, df_cleaned, X_scaled, technical_columns, weights, result_df,
+                 output_format='xlsx', log=print):
+    """写出原始数据、标准化数据、主成分权重和指数结果四张表，返回输出路径
+
+    xlsx 格式写入同一个工作簿的四个工作表，parquet / csv 格式写入 output_stem 目录下的四个文件。
+    """
+    sheets = [
+        ('1_原始数据', df_cleaned),
+        ('2_标准化数据', pd.DataFrame(X_scaled, columns=technical_columns)),
+        ('3_主成分权重', pd.DataFrame({'指标名称': technical_columns, '权重值': weights})),
+        ('4_指数结果', result_df),
+    ]
+    output_path, stats = write_tables(output_stem, sheets, output_format)
+    log(f'写出统计:\n{format_stats(stats)}')
+    return output_path
+
+
+def run_interactive():
+    """原有的单年份交互流程：处理2013年数据，完成后尝试打开结果文件"""
+    print('正在读取2013年年报词频统计数据...')
+    file_path = '2013年年报技术关键词统计.xlsx'
+
     try:
-        if platform.system() == 'Windows':
-            os.startfile(output_file)
-        else:
-            subprocess.run(['open' if platform.system() == 'Darwin' else 'xdg-open', output_file])
-        print('结果文件已自动打开')
+        df = read_keyword_table(file_path)
+        print(f'成功读取文件: {file_path}')
     except Exception as e:
-        print(f'自动打开文件失败，请手动打开: {output_file}')
-
-except PermissionError:
-    print("\n错误：无法写入文件，可能原因及解决方法：")
-    print("1. 请确保Excel文件没有被打开")
-    print("2. 尝试以管理员身份运行此程序")
-    print("3. 将文件保存到其他位置（如桌面）")
-    output_file = os.path.expanduser(f'~/Desktop/2013年数字化转型指数结果表.xlsx')
-    print(f'已尝试保存到桌面: {output_file}')
-except Exception as e:
-    print(f'保存文件时发生错误: {str(e)}')
-
-# 在非交互式环境中自动退出
-import sys
-try:
-    # 尝试使用input函数（交互式环境）
-    input('处理完成，按回车键关闭窗口...')
-except EOFError:
-    # 在非交互式环境中直接退出
-    print('处理完成，程序已自动退出')
-    sys.exit(0)
\ No newline at end of file
+        print(f'错误：无法读取文件: {str(e)}')
+        input('按回车键退出...')
+        exit()
+
+    try:
+        df_cleaned, technical_columns = clean_keyword_table(df)
+    except IndexInputError as e:
+        print(f'错误：{e}')
+        input('按回车键退出...')
+        exit()
+
+    X_scaled, weights, result_df, _ = compute_index(df_cleaned, technical_columns)
+
+    print('正在保存结果文件...')
+    try:
+        # 尝试保存文件，如遇权限问题则生成唯一文件名
+        output_file = get_unique_filename('2013年数字化转型指数结果表.xlsx')
+        save_results(os.path.splitext(output_file)[0], df_cleaned, X_scaled, technical_columns, weights, result_df)
+
+        print(f'结果已成功保存至: {os.path.abspath(output_file)}')
+
+        # 尝试自动打开文件
+        try:
+            if platform.system() == 'Windows':
+                os.startfile(output_file)
+            else:
+                subprocess.run(['open' if platform.system() == 'Darwin' else 'xdg-open', output_file])
+            print('结果文件已自动打开')
+        except Exception as e:
+            print(f'自动打开文件失败，请手动打开: {output_file}')
+
+    except PermissionError:
+        print("\n错误：无法写入文件，可能原因及解决方法：")
+        print("1. 请确保Excel文件没有被打开")
+        print("2. 尝试以管理员身份运行此程序")
+        print("3. 将文件保存到其他位置（如桌面）")
+        output_file = os.path.expanduser(f'~/Desktop/2013年数字化转型指数结果表.xlsx')
+        print(f'已尝试保存到桌面: {output_file}')
+    except Exception as e:
+        print(f'保存文件时发生错误: {str(e)}')
+
+    # 在非交互式环境中自动退出
+    try:
+        # 尝试使用input函数（交互式环境）
+        input('处理完成，按回车键关闭窗口...')
+    except EOFError:
+        # 在非交互式环境中直接退出
+        print('处理完成，程序已自动退出')
+        sys.exit(0)
+
+
+# ----------------------
+# 6. 批处理模式
+# ----------------------
+def find_input_files(inputs):
+    """把目录、通配符和文件路径展开成去重排序后的工作簿列表"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for ext in INPUT_EXTENSIONS:
+                files.extend(glob.glob(os.path.join(item, f'*年报技术关键词统计{ext}')))
+        elif glob.has_magic(item):
+            files.extend(glob.glob(item))
+        elif os.path.exists(item):
+            files.append(item)
+    # 排除 Excel 打开文件时生成的临时文件
+    files = [f for f in files if not os.path.basename(f).startswith('~$')]
+    return sorted(set(files))
+
+
+def year_from_filename(file_path):
+    """从文件名中提取年份，如“2013年年报技术关键词统计.xlsx” -> 2013"""
+    match = re.search(r'(\d{4})年', os.path.basename(file_path))
+    return int(match.group(1)) if match else None
+
+
+def process_year(file_path, output_dir, model=None, save_model=None, output_format=DEFAULT_BATCH_FORMAT):
+    """批处理的单个任务：计算一个年度工作簿的指数并写出该年的结果表
+
+    传入 model 时只用该模型评分而不重新拟合；传入 save_model 时把本次拟合的模型保存到该路径。
+    """
+    name = os.path.basename(file_path)
+
+    def log(message):
+        print(f'[{name}] {message}', flush=True)
+
+    df = read_keyword_table(file_path)
+    if '年份' not in df.columns:
+        year = year_from_filename(file_path)
+        if year is None:
+            raise IndexInputError('数据缺少“年份”列，且无法从文件名中识别年份')
+        df['年份'] = year
+    years = sorted(df['年份'].dropna().unique())
+    label = str(int(years[0])) if len(years) == 1 else os.path.splitext(name)[0]
+
+    df_cleaned, technical_columns = clean_keyword_table(df, log=log)
+    if model is not None:
+        technical_columns, weights = model.technical_columns, model.weights
+        X_scaled, result_df = score_with_model(df_cleaned, model)
+        log(f'已使用模型评分（{model.created_at} 拟合，{model.n_components} 个主成分）')
+    else:
+        X_scaled, weights, result_df, fitted_model = compute_index(df_cleaned, technical_columns, log=log)
+        if save_model:
+            fitted_model.save(save_model)
+            log(f'模型已保存至: {os.path.abspath(save_model)}')
+
+    output_stem = os.path.join(output_dir, f'{label}年数字化转型指数结果表')
+    output_file = save_results(output_stem, df_cleaned, X_scaled, technical_columns, weights, result_df,
+                               output_format, log=log)
+    log(f'结果已保存至: {os.path.abspath(output_file)}')
+    return output_file, result_df
+
+
+def build_merged_panel(results):
+    """把各年份的指数结果合并成分析平台读取的面板格式"""
+    panel = pd.concat(results, ignore_index=True)
+    for col in MERGED_COLUMNS:
+        if col not in panel.columns:
+            panel[col] = None
+    extra_columns = [col for col in panel.columns if col not in MERGED_COLUMNS]
+    return panel[MERGED_COLUMNS + extra_columns].sort_values(['年份', '股票代码'], kind='stable')
+
+
+def run_batch(inputs, output_dir, workers=None, merged_name=MERGED_FILENAME, model=None, save_model=None,
+              output_format=DEFAULT_BATCH_FORMAT):
+    """并行处理多个年度工作簿，写出各年结果和合并面板，返回退出码
+
+    output_format 只用于各年的结果表，合并面板始终为 MERGED_FORMAT。
+    """
+    files = find_input_files(inputs)
+    if not files:
+        print(f'错误：没有找到输入文件: {inputs}', file=sys.stderr)
+        return EXIT_USAGE
+    if save_model and len(files) != 1:
+        print('错误：批处理模式下 --save-model 只能用于单个输入文件；合并多个年份拟合请配合 --streaming 使用',
+              file=sys.stderr)
+        return EXIT_USAGE
+    os.makedirs(output_dir, exist_ok=True)
+    print(f'共 {len(files)} 个输入文件，输出目录: {os.path.abspath(output_dir)}', flush=True)
+
+    results = {}
+    failures = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_year, file_path, output_dir, model, save_model, output_format): file_path
+                   for file_path in files}
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                results[file_path] = future.result()[1]
+            except Exception as e:
+                failures[file_path] = e
+                print(f'错误：处理 {file_path} 失败: {e}', file=sys.stderr, flush=True)
+
+    if results and merged_name:
+        merged_stem = os.path.join(output_dir, os.path.splitext(merged_name)[0])
+        try:
+            panel = build_merged_panel([results[f] for f in files if f in results])
+            merged_file, _ = write_tables(merged_stem, [('Sheet1', panel)], MERGED_FORMAT)
+            print(f'合并面板已保存至: {os.path.abspath(merged_file)}（{len(panel)} 条记录）', flush=True)
+        except Exception as e:
+            print(f'错误：保存合并面板失败: {e}', file=sys.stderr)
+            return EXIT_FAILED
+
+    print(f'处理完成：成功 {len(results)} 个，失败 {len(failures)} 个', flush=True)
+    return EXIT_FAILED if failures else EXIT_OK
+
+
+# ----------------------
+# 7. 流式模式（数据量超出内存时）
+# ----------------------
+def iter_cleaned_chunks(files, chunksize, technical_columns=None, allow_extra_columns=False):
+    """逐块读取并清洗所有输入文件，产出 (清洗后的数据块, 技术指标列)
+
+    allow_extra_columns 为 True 时（用已保存的模型评分）只要求包含给定的技术指标列。
+    """
+    for file_path in files:
+        for chunk_number, chunk in enumerate(iter_table_chunks(file_path, chunksize)):
+            if chunk_number == 0:
+                missing_columns = [col for col in required_columns if col not in chunk.columns]
+                if missing_columns:
+                    raise IndexInputError(f'{file_path} 缺少必要的列: {missing_columns}')
+                columns = [col for col in chunk.columns if col not in exclude_columns]
+                if technical_columns is None:
+                    technical_columns = columns
+                elif allow_extra_columns:
+                    missing_columns = [col for col in technical_columns if col not in columns]
+                    if missing_columns:
+                        raise IndexInputError(f'{file_path} 缺少模型所需的技术指标列: {missing_columns}')
+                elif sorted(columns) != sorted(technical_columns):
+                    raise IndexInputError(f'{file_path} 的技术指标列与其他文件不一致: {columns}')
+            chunk['股票代码'] = normalize_stock_codes(chunk['股票代码'])
+            if '年份' not in chunk.columns:
+                year = year_from_filename(file_path)
+                if year is None:
+                    raise IndexInputError(f'{file_path} 缺少“年份”列，且无法从文件名中识别年份')
+                chunk['年份'] = year
+            present_tech_columns = [col for col in tech_columns if col in chunk.columns]
+            df_cleaned = chunk.dropna(subset=present_tech_columns + required_columns)
+            if not df_cleaned.empty:
+                yield df_cleaned, technical_columns
+
+
+def run_streaming(inputs, output_dir, chunksize=DEFAULT_CHUNKSIZE, model=None, save_model=None,
+                  output_format=DEFAULT_STREAMING_FORMAT):
+    """把所有输入当作一个数据流分块计算指数：单遍拟合权重，再分块写出结果，返回退出码
+
+    传入 model 时跳过拟合，只需一遍读取即可完成评分。
+    """
+    files = find_input_files(inputs)
+    if not files:
+        print(f'错误：没有找到输入文件: {inputs}', file=sys.stderr)
+        return EXIT_USAGE
+    os.makedirs(output_dir, exist_ok=True)
+    print(f'流式模式：共 {len(files)} 个输入文件，每块 {chunksize} 行', flush=True)
+
+    try:
+        if model is None:
+            # 第一遍：累积运行统计量，拟合标准化参数和权重
+            fitter = None
+            for df_cleaned, technical_columns in iter_cleaned_chunks(files, chunksize):
+                if fitter is None:
+                    fitter = StreamingIndexFitter(technical_columns)
+                fitter.partial_fit(df_cleaned[fitter.technical_columns].values)
+            if fitter is None:
+                raise IndexInputError('清洗后没有可用于计算的记录')
+            fit = fitter.finalize()
+            print(f'将用于计算的技术指标: {fitter.technical_columns}')
+            print(f'共 {fit["n_samples"]} 条有效记录，选择 {fit["n_components"]} 个主成分，'
+                  f'累计解释方差比例: {np.cumsum(fit["explained_variance_ratio"])[fit["n_components"]-1]:.2%}', flush=True)
+
+            # 第二遍：求指数的最小、最大值，用于归一化到0-100分
+            model = IndexModel.from_fit(fitter.technical_columns, fit, lower=0.0, upper=1.0)
+            lower, upper = np.inf, -np.inf
+            for df_cleaned, _ in iter_cleaned_chunks(files, chunksize, model.technical_columns):
+                values = model.raw_scores(df_cleaned[model.technical_columns].values)
+                lower, upper = min(lower, values.min()), max(upper, values.max())
+            model.lower, model.upper = float(lower), float(upper)
+            if save_model:
+                model.save(save_model)
+                print(f'模型已保存至: {os.path.abspath(save_model)}')
+        else:
+            print(f'使用已保存的模型评分（{model.created_at} 拟合，{model.n_components} 个主成分），跳过拟合', flush=True)
+
+        # 逐块计算0-100分指数并追加写出
+        technical_columns = model.technical_columns
+        # 各文件不一定都有行业列，输出列固定下来，保证逐块追加时列对齐
+        result_columns = (required_columns + ['年份', '数字化转型指数(0-100分)'] + technical_columns
+                          + ['总词频数', '行业代码', '行业名称'])
+        chunks = iter_cleaned_chunks(files, chunksize, technical_columns, allow_extra_columns=True)
+        result_chunks = (
+            build_result_table(df_cleaned, technical_columns, model.score(df_cleaned)).reindex(columns=result_columns)
+            for df_cleaned, _ in chunks
+        )
+        result_file, stats = write_tables(os.path.join(output_dir, STREAMING_RESULT_NAME),
+                                          [('指数结果', result_chunks)], output_format)
+        print(f'写出统计:\n{format_stats(stats)}')
+
+        weights_file, _ = write_tables(os.path.join(output_dir, STREAMING_WEIGHTS_NAME),
+                                       [('主成分权重', pd.DataFrame({'指标名称': technical_columns,
+                                                                  '权重值': model.weights}))],
+                                       output_format)
+    except (IndexInputError, ValueError, OSError) as e:
+        print(f'错误：{e}', file=sys.stderr)
+        return EXIT_FAILED
+
+    print(f'结果已保存至: {os.path.abspath(result_file)}')
+    print(f'权重已保存至: {os.path.abspath(weights_file)}', flush=True)
+    return EXIT_OK
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='数字化转型指数计算（不带参数时按原流程处理2013年数据）')
+    parser.add_argument('inputs', nargs='*', help='年度词频工作簿、所在目录或通配符；提供后进入批处理模式')
+    parser.add_argument('--output-dir', default='.', help='批处理结果的输出目录（默认当前目录）')
+    parser.add_argument('--workers', type=int, default=None, help='并行进程数（默认等于CPU核数）')
+    parser.add_argument('--merged-name', default=MERGED_FILENAME, help='合并面板的文件名，传空字符串则不生成')
+    parser.add_argument('--streaming', action='store_true',
+                        help='流式模式：把所有输入合并为一个数据流分块计算，内存占用与数据量无关')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help='流式模式每块读取的行数')
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default=None,
+                        help=f'结果表的输出格式（默认批处理 {DEFAULT_BATCH_FORMAT}，流式模式 {DEFAULT_STREAMING_FORMAT}）')
+    model_group = parser.add_mutually_exclusive_group()
+    model_group.add_argument('--save-model', metavar='PATH',
+                             help='保存拟合得到的指数模型（流式模式，或批处理模式下的单个输入文件）')
+    model_group.add_argument('--model', metavar='PATH', help='只用已保存的模型评分，不重新拟合')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.inputs:
+        run_interactive()
+        return EXIT_OK
+    model = None
+    if args.model:
+        try:
+            model = IndexModel.load(args.model)
+        except (OSError, ValueError, KeyError) as e:
+            print(f'错误：无法读取模型文件 {args.model}: {e}', file=sys.stderr)
+            return EXIT_USAGE
+    if args.streaming:
+        return run_streaming(args.inputs, args.output_dir, args.chunksize, model, args.save_model,
+                             args.output_format or DEFAULT_STREAMING_FORMAT)
+    return run_batch(args.inputs, args.output_dir, args.workers, args.merged_name, model, args.save_model,
+                     args.output_format or DEFAULT_BATCH_FORMAT)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -1,73 +1,19 @@
+import uuid
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import plotly.express as px
 
-# 省份提取函数
-def extract_province(company_name):
-    """从企业名称中提取省份信息"""
-    if not company_name or pd.isna(company_name):
-        return "未知"
-    
-    # 定义省份和直辖市的关键词字典
-    provinces = {
-        '北京': ['北京', '京'],
-        '上海': ['上海', '沪', '浦发'],
-        '广东': ['广东', '粤', '深圳', '广州', '东莞', '佛山', '珠海'],
-        '江苏': ['江苏', '苏', '南京', '苏州', '无锡', '常州'],
-        '浙江': ['浙江', '浙', '杭州', '宁波', '温州', '绍兴'],
-        '山东': ['山东', '鲁', '青岛', '济南', '烟台', '淄博'],
-        '河北': ['河北', '冀', '石家庄', '唐山', '邯郸'],
-        '河南': ['河南', '豫', '郑州', '洛阳'],
-        '湖北': ['湖北', '鄂', '武汉', '黄石', '十堰'],
-        '湖南': ['湖南', '湘', '长沙', '株洲', '湘潭'],
-        '四川': ['四川', '川', '蜀', '成都', '绵阳'],
-        '陕西': ['陕西', '陕', '秦', '西安', '宝鸡'],
-        '安徽': ['安徽', '皖', '合肥', '芜湖'],
-        '福建': ['福建', '闽', '福州', '厦门'],
-        '江西': ['江西', '赣', '南昌', '九江'],
-        '广西': ['广西', '桂', '南宁', '柳州'],
-        '云南': ['云南', '滇', '昆明'],
-        '贵州': ['贵州', '黔', '贵阳'],
-        '辽宁': ['辽宁', '辽', '沈阳', '大连'],
-        '吉林': ['吉林', '吉', '长春'],
-        '黑龙江': ['黑龙江', '黑', '哈尔滨'],
-        '天津': ['天津', '津'],
-        '重庆': ['重庆', '渝'],
-        '山西': ['山西', '晋', '太原'],
-        '内蒙古': ['内蒙古', '蒙', '呼和浩特'],
-        '西藏': ['西藏', '藏', '拉萨'],
-        '新疆': ['新疆', '疆', '乌鲁木齐'],
-        '青海': ['青海', '青', '西宁'],
-        '甘肃': ['甘肃', '甘', '陇', '兰州'],
-        '宁夏': ['宁夏', '宁', '银川'],
-        '海南': ['海南', '琼', '海口', '三亚']
-    }
-    
-    # 特殊处理
-    special_cases = {
-        '东北': '辽宁',  # 东北高速 -> 辽宁
-        '西南': '四川',
-        '华北': '北京',
-        '华东': '上海',
-        '华南': '广东',
-        '华中': '湖北'
-    }
-    
-    # 检查特殊情况
-    for key, province in special_cases.items():
-        if key in company_name:
-            return province
-    
-    # 检查省份关键词
-    for province, keywords in provinces.items():
-        for keyword in keywords:
-            if keyword in company_name:
-                return province
-    
-    return "未知"
+from utils.china_geo import (
+    MAP_HEIGHT_PX, MAP_WIDTH_PX, PROVINCE_PINYIN, available_levels, feature_bounds, load_provinces, pick_level,
+    visible_span,
+)
+from utils.diagnostics import DIAGNOSTICS_ENV, diagnostics_mode, start_rerun
+from utils.figure_cache import FigureCache, figure_size, filter_key
+from utils.filter_plan import parse_terms
+from utils.hot_reload import DatasetWatcher, reload_interval
+from utils.panel import MOVER_METRICS
 
 # 设置页面配置
 st.set_page_config(
@@ -177,9 +123,13 @@ mermaid_script = """
 st.markdown(mermaid_script, unsafe_allow_html=True)
 
 # 数据加载与处理
-@st.cache_data
-def load_data():
-    """加载并处理数字化转型指数数据"""
+@st.cache_resource
+def get_data_watcher():
+    """加载并处理数字化转型指数数据，同时构建筛选索引，并在后台监视数据文件的更新
+
+    数据集每个进程只加载一份，所有会话共享同一个只读对象（见 utils/dataset.py）；
+    数据文件更新后在后台构建新版本并整体替换（见 utils/hot_reload.py）。
+    """
     try:
         # 支持多种文件路径
         import os
@@ -191,211 +141,118 @@ def load_data():
         
         for path in possible_paths:
             if os.path.exists(path):
-                df = pd.read_excel(path)
-                break
+                # 工作簿或省份规则未变化时直接读取缓存，变化后自动重建；
+                # 查询后端由环境变量 DT_INDEX_BACKEND 选择（pandas / sqlite / duckdb）
+                watcher = DatasetWatcher.open(path)
+                watcher.start(reload_interval())
+                return watcher
         else:
             st.error("未找到数据文件")
             return None
-        
-        # 数据处理
-        df['股票代码'] = df['股票代码'].astype(str)
-        df['年份'] = df['年份'].astype(int)
-        
-        # 从企业名称提取省份信息
-        df['省份'] = df['企业名称'].apply(extract_province)
-        
-        # 确保行业名称不为空
-        df['行业名称'] = df['行业名称'].fillna('未知行业')
-        df['行业代码'] = df['行业代码'].fillna('未知')
-        
-        return df
     except Exception as e:
         st.error(f"数据加载失败: {str(e)}")
         return None
 
-# 加载数据
-df = load_data()
 
-if df is not None:
-    # 应用标题
-    st.title("数字化转型指数分析平台")
-    st.markdown("---")
-    
-    # 侧边栏筛选器
-    st.sidebar.header("数据筛选")
-    
-    # 股票代码搜索（支持多个，用逗号分隔）
-    stock_codes = st.sidebar.text_input("股票代码（多个用逗号分隔）")
-    
-    # 年份筛选（支持多选）
-    years = sorted(df['年份'].unique())
-    default_years = [2021]  # 默认选择有完整数据的年份
-    selected_years = st.sidebar.multiselect("选择年份", years, default=default_years)
-    
-    # 年份提示
-    if any(year > 2021 for year in selected_years):
-        st.sidebar.warning("⚠️ 提示：2022年后行业数据不完整，建议查看2021年及之前的数据")
-    
-    # 行业筛选（支持多选）
-    industries = sorted(df['行业名称'].unique())
-    selected_industries = st.sidebar.multiselect("选择行业（可多选）", industries)
-    
-    # 省份筛选（支持多选）
-    provinces = sorted(df['省份'].unique())
-    selected_provinces = st.sidebar.multiselect("选择省份（可多选）", provinces)
-    
-    # 企业名称搜索（支持多个，用逗号分隔）
-    company_names = st.sidebar.text_input("企业名称（多个用逗号分隔）")
-    
-    # 筛选数据
-    filtered_df = df.copy()
-    
-    # 年份筛选
-    if selected_years:
-        filtered_df = filtered_df[filtered_df['年份'].isin(selected_years)]
-    
-    # 行业筛选
-    if selected_industries:
-        filtered_df = filtered_df[filtered_df['行业名称'].isin(selected_industries)]
-    
-    # 省份筛选
-    if selected_provinces:
-        filtered_df = filtered_df[filtered_df['省份'].isin(selected_provinces)]
-    
-    # 企业名称筛选
-    if company_names:
-        names = [name.strip() for name in company_names.split(',') if name.strip()]
-        if names:
-            filtered_df = filtered_df[filtered_df['企业名称'].str.contains('|'.join(names), case=False, na=False)]
-    
-    # 股票代码筛选
-    if stock_codes:
-        codes = [code.strip() for code in stock_codes.split(',') if code.strip()]
-        if codes:
-            filtered_df = filtered_df[filtered_df['股票代码'].str.contains('|'.join(codes), case=False, na=False)]
-    
-    # 主内容区域
-    with st.container():
-        # 数据概览
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.metric("企业数量", len(filtered_df))
-        
-        if filtered_df.empty:
-            st.warning("当前筛选条件下没有数据")
-        else:
-            avg_index = filtered_df['数字化转型指数(0-100分)'].mean()
-            max_index = filtered_df['数字化转型指数(0-100分)'].max()
-            min_index = filtered_df['数字化转型指数(0-100分)'].min()
-            
-            with col2:
-                st.metric("平均指数", f"{avg_index:.1f}")
-            with col3:
-                st.metric("最高指数", int(max_index))
-            with col4:
-                st.metric("最低指数", int(min_index))
-        
-        # 数字化转型指数分布与趋势图表
-        st.subheader("数字化转型指数分析")
-        
-        # 创建两列布局
-        col_left, col_right = st.columns(2)
-        
-        with col_left:
-            # 左侧：指数分布直方图
-            if not filtered_df.empty:
-                fig_dist = px.histogram(
-                    filtered_df,
-                    x='数字化转型指数(0-100分)',
-                    title='数字化转型指数分布',
-                    color_discrete_sequence=['#1f77b4'],
-                    labels={'数字化转型指数(0-100分)': '数字化转型指数(0-100分)', 'count': '企业数量'}
-                )
-                fig_dist.update_layout(
-                    bargap=0.1,
-                    xaxis=dict(range=[0, 100], title='数字化转型指数(0-100分)'),
-                    yaxis=dict(title='企业数量'),
-                    plot_bgcolor='#f9f2f4',
-                    paper_bgcolor='#f9f2f4',
-                    font=dict(family='Arial', size=12),
-                    title_x=0.5
-                )
-                st.plotly_chart(fig_dist, width='stretch')
-            else:
-                st.info("当前筛选条件下没有足够的数据生成分布图")
-        
-        with col_right:
-            # 右侧：指数季度趋势图
-            trend_df = df.copy()
-            
-            # 应用与主筛选相同的条件（除年份外）
-            if selected_industries:
-                trend_df = trend_df[trend_df['行业名称'].isin(selected_industries)]
-            if selected_provinces:
-                trend_df = trend_df[trend_df['省份'].isin(selected_provinces)]
-            if company_names:
-                names = [name.strip() for name in company_names.split(',') if name.strip()]
-                if names:
-                    trend_df = trend_df[trend_df['企业名称'].str.contains('|'.join(names), case=False, na=False)]
-            if stock_codes:
-                codes = [code.strip() for code in stock_codes.split(',') if code.strip()]
-                if codes:
-                    trend_df = trend_df[trend_df['股票代码'].str.contains('|'.join(codes), case=False, na=False)]
-            
-            if not trend_df.empty:
-                # 计算每年平均指数
-                annual_avg = trend_df.groupby('年份')['数字化转型指数(0-100分)'].mean().reset_index()
-                annual_avg = annual_avg.sort_values('年份')
-                
-                # 绘制趋势图
-                fig_trend = px.line(
-                    annual_avg,
-                    x='年份',
-                    y='数字化转型指数(0-100分)',
-                    title='指数年度趋势',
-                    markers=True,
-                    color_discrete_sequence=['#1f77b4'],
-                    labels={'数字化转型指数(0-100分)': '指数值', '年份': '年份'}
-                )
-                fig_trend.update_layout(
-                    xaxis=dict(tickmode='linear', title='年份'),
-                    yaxis=dict(title='指数值'),
-                    plot_bgcolor='#f9f2f4',
-                    paper_bgcolor='#f9f2f4',
-                    font=dict(family='Arial', size=12),
-                    title_x=0.5
-                )
-                st.plotly_chart(fig_trend, width='stretch')
-            else:
-                st.info("当前筛选条件下没有足够的数据生成趋势图")
-    
-    # 企业排名表格
-    st.subheader("企业排名")
-    if not filtered_df.empty:
-            ranked_df = filtered_df.sort_values(by='数字化转型指数(0-100分)', ascending=False)
-            display_df = ranked_df[['股票代码', '企业名称', '省份', '行业名称', '数字化转型指数(0-100分)', '总词频数']].head(20)
-            display_df.insert(0, '排名', range(1, len(display_df) + 1))
-            st.dataframe(display_df, width='stretch')
-    
-    # 行业对比分析
-    st.subheader("行业对比分析")
-    year_data = df.copy()
-    
-    # 应用年份筛选
-    if selected_years:
-        year_data = year_data[year_data['年份'].isin(selected_years)]
-    
-    # 应用省份筛选
-    if selected_provinces:
-        year_data = year_data[year_data['省份'].isin(selected_provinces)]
-    
-    industry_avg = year_data.groupby('行业名称')['数字化转型指数(0-100分)'].mean().sort_values(ascending=False).reset_index()
-    
+def load_data():
+    """当前版本的数据集；每次运行开始时取一次，本次运行中各区块都使用这一份"""
+    watcher = get_data_watcher()
+    return watcher.current() if watcher is not None else None
+
+
+@st.cache_resource
+def load_province_geojson(level):
+    """指定简化级别的本地省界 GeoJSON，每个进程只读取一次；没有省界文件时返回 None"""
+    if level is None:
+        return None
+    return load_provinces(level)
+
+
+@st.cache_resource
+def get_figure_cache():
+    """进程内所有会话共享的图表缓存（按依赖的筛选条件为键，按大小做 LRU 淘汰）"""
+    return FigureCache()
+
+
+@st.cache_resource
+def load_province_bounds():
+    """各省的经纬度范围（取自最粗的一级省界），用于估计地图缩放后的显示范围；没有省界文件时返回 {}"""
+    levels = available_levels()
+    geojson = load_province_geojson(levels[0]) if levels else None
+    return feature_bounds(geojson) if geojson is not None else {}
+
+
+# ----------------------
+# 图表构建：每个函数只读取自己依赖的筛选条件，返回图表、提示文字或 None（不显示）
+# ----------------------
+def build_distribution_figure(plan):
+    """指数分布直方图（服务端按 0-100 分逐分计数，图表只传 101 个计数）"""
+    index_counts = plan.histogram('指数分布', ['年份', '行业名称', '省份', '企业名称', '股票代码'])
+    if not index_counts.any():
+        return "当前筛选条件下没有足够的数据生成分布图"
+    dist_df = pd.DataFrame({
+        '数字化转型指数(0-100分)': np.arange(len(index_counts)),
+        '企业数量': index_counts,
+    })
+    fig_dist = px.bar(
+        dist_df,
+        x='数字化转型指数(0-100分)',
+        y='企业数量',
+        title='数字化转型指数分布',
+        color_discrete_sequence=['#1f77b4']
+    )
+    fig_dist.update_layout(
+        bargap=0.1,
+        xaxis=dict(range=[0, 100], title='数字化转型指数(0-100分)'),
+        yaxis=dict(title='企业数量'),
+        plot_bgcolor='#f9f2f4',
+        paper_bgcolor='#f9f2f4',
+        font=dict(family='Arial', size=12),
+        title_x=0.5
+    )
+    return fig_dist
+
+
+def build_trend_figure(plan):
+    """指数年度趋势图：应用与主筛选相同的条件（除年份外），计算每年平均指数"""
+    annual_avg = plan.average('年度趋势', '年份', ['行业名称', '省份', '企业名称', '股票代码'])
+
+    if not annual_avg.empty:
+        annual_avg = annual_avg.sort_values('年份')
+
+        # 绘制趋势图
+        fig_trend = px.line(
+            annual_avg,
+            x='年份',
+            y='数字化转型指数(0-100分)',
+            title='指数年度趋势',
+            markers=True,
+            color_discrete_sequence=['#1f77b4'],
+            labels={'数字化转型指数(0-100分)': '指数值', '年份': '年份'}
+        )
+        fig_trend.update_layout(
+            xaxis=dict(tickmode='linear', title='年份'),
+            yaxis=dict(title='指数值'),
+            plot_bgcolor='#f9f2f4',
+            paper_bgcolor='#f9f2f4',
+            font=dict(family='Arial', size=12),
+            title_x=0.5
+        )
+        return fig_trend
+    else:
+        return "当前筛选条件下没有足够的数据生成趋势图"
+
+
+def build_industry_figure(plan, selected_years):
+    """行业平均指数 Top10 柱状图，应用年份和省份筛选"""
+    # 应用年份和省份筛选
+    industry_avg = plan.average('行业对比', '行业名称', ['年份', '省份'])
+    industry_avg = industry_avg.sort_values('数字化转型指数(0-100分)', ascending=False).reset_index(drop=True)
+
     if len(industry_avg) > 1:
         # 只显示非未知行业的数据
         industry_avg_non_unknown = industry_avg[industry_avg['行业名称'] != '未知行业']
-        
+
         if len(industry_avg_non_unknown) > 0:
             # 设置图表标题
             if selected_years:
@@ -405,7 +262,7 @@ if df is not None:
                     title = f"{min(selected_years)}-{max(selected_years)}年各行业平均指数Top10"
             else:
                 title = "各行业平均指数Top10"
-            
+
             fig = px.bar(
                 industry_avg_non_unknown.head(10),
                 x='行业名称',
@@ -415,28 +272,21 @@ if df is not None:
                 color_continuous_scale='Blues'
             )
             fig.update_layout(xaxis_tickangle=-45)
-            st.plotly_chart(fig, width='stretch')
+            return fig
         else:
-            st.info("当前条件下没有非未知行业数据")
-    
-    # 省份对比分析
-    st.subheader("省份对比分析")
-    year_data_province = df.copy()
-    
-    # 应用年份筛选
-    if selected_years:
-        year_data_province = year_data_province[year_data_province['年份'].isin(selected_years)]
-    
-    # 应用行业筛选
-    if selected_industries:
-        year_data_province = year_data_province[year_data_province['行业名称'].isin(selected_industries)]
-    
-    province_avg = year_data_province.groupby('省份')['数字化转型指数(0-100分)'].mean().sort_values(ascending=False).reset_index()
-    
+            return "当前条件下没有非未知行业数据"
+
+
+def build_province_figure(plan, selected_years):
+    """省份平均指数 Top10 柱状图，应用年份和行业筛选"""
+    # 应用年份和行业筛选
+    province_avg = plan.average('省份对比', '省份', ['年份', '行业名称'])
+    province_avg = province_avg.sort_values('数字化转型指数(0-100分)', ascending=False).reset_index(drop=True)
+
     if len(province_avg) > 1:
         # 只显示非未知省份的数据
         province_avg_non_unknown = province_avg[province_avg['省份'] != '未知']
-        
+
         if len(province_avg_non_unknown) > 0:
             # 设置图表标题
             if selected_years:
@@ -446,7 +296,7 @@ if df is not None:
                     title = f"{min(selected_years)}-{max(selected_years)}年各省份平均指数Top10"
             else:
                 title = "各省份平均指数Top10"
-            
+
             fig = px.bar(
                 province_avg_non_unknown.head(10),
                 x='省份',
@@ -456,90 +306,39 @@ if df is not None:
                 color_continuous_scale='Greens'
             )
             fig.update_layout(xaxis_tickangle=-45)
-            st.plotly_chart(fig, width='stretch')
+            return fig
         else:
-            st.info("当前条件下没有非未知省份数据")
-    
+            return "当前条件下没有非未知省份数据"
 
-    
-    # 数字化转型指数地图分布
-    st.subheader("数字化转型指数地理分布")
-    # 应用年份筛选（如果选择了多个年份，默认使用最新年份）
-    if selected_years:
-        map_data = df[df['年份'] == max(selected_years)]
-    else:
-        map_data = df[df['年份'] == df['年份'].max()]
-    
-    # 应用筛选条件
-    if selected_industries:
-        map_data = map_data[map_data['行业名称'].isin(selected_industries)]
-    if company_names:
-        names = [name.strip() for name in company_names.split(',') if name.strip()]
-        if names:
-            map_data = map_data[map_data['企业名称'].str.contains('|'.join(names), case=False, na=False)]
-    if stock_codes:
-        codes = [code.strip() for code in stock_codes.split(',') if code.strip()]
-        if codes:
-            map_data = map_data[map_data['股票代码'].str.contains('|'.join(codes), case=False, na=False)]
-    
-    # 计算各省份平均指数
-    province_map_data = map_data.groupby('省份')['数字化转型指数(0-100分)'].mean().reset_index()
+
+def build_map_figure(plan, map_year):
+    """各省份指数地图：应用年份筛选（选择多个年份时使用最新年份）及行业、企业名称、股票代码筛选"""
+    province_map_data = plan.average('地理分布', '省份', ['年份', '行业名称', '企业名称', '股票代码'], {'年份': [map_year]})
     province_map_data = province_map_data[province_map_data['省份'] != '未知']
-    
+
     if not province_map_data.empty:
-        # 使用Plotly的中国地图可视化
-        # 获取当前地图数据使用的年份
-        map_year = max(selected_years) if selected_years else df['年份'].max()
-        
-        # 为中国省份创建一个映射字典，确保Plotly能正确识别
-        province_mapping = {
-            '北京': 'Beijing',
-            '上海': 'Shanghai',
-            '广东': 'Guangdong',
-            '江苏': 'Jiangsu',
-            '浙江': 'Zhejiang',
-            '山东': 'Shandong',
-            '河北': 'Hebei',
-            '河南': 'Henan',
-            '湖北': 'Hubei',
-            '湖南': 'Hunan',
-            '四川': 'Sichuan',
-            '陕西': 'Shaanxi',
-            '安徽': 'Anhui',
-            '福建': 'Fujian',
-            '江西': 'Jiangxi',
-            '广西': 'Guangxi',
-            '云南': 'Yunnan',
-            '贵州': 'Guizhou',
-            '辽宁': 'Liaoning',
-            '吉林': 'Jilin',
-            '黑龙江': 'Heilongjiang',
-            '天津': 'Tianjin',
-            '重庆': 'Chongqing',
-            '山西': 'Shanxi',
-            '内蒙古': 'Nei Mongol',
-            '西藏': 'Xizang',
-            '新疆': 'Xinjiang',
-            '青海': 'Qinghai',
-            '甘肃': 'Gansu',
-            '宁夏': 'Ningxia',
-            '海南': 'Hainan'
-        }
-        
         # 创建带英文省份名称的地图数据
         map_data_with_en = province_map_data.copy()
-        map_data_with_en['Province_EN'] = map_data_with_en['省份'].map(province_mapping)
-        
+        map_data_with_en['Province_EN'] = map_data_with_en['省份'].map(PROVINCE_PINYIN)
+
         # 过滤掉无法映射的省份
         map_data_with_en = map_data_with_en.dropna(subset=['Province_EN'])
-        
+
         if not map_data_with_en.empty:
+            # 使用本地省界 GeoJSON；Plotly 内置的世界地图没有中国省级边界，没有省界文件时不绘制地图。
+            # 地图缩放到有数据的省份，只剩少数几个省份时放大显示，需要更细的一级省界
+            span = visible_span(load_province_bounds(), map_data_with_en['Province_EN'], MAP_WIDTH_PX, MAP_HEIGHT_PX)
+            geojson = load_province_geojson(pick_level(MAP_WIDTH_PX, span))
+            if geojson is None:
+                return ("未找到省界文件，地图不可用。请把省级边界 GeoJSON 放到 geo/china_provinces.low.geojson"
+                        "（见 README“地图省界”），然后重启应用")
+
             # 创建中国地图
             fig = px.choropleth(
                 map_data_with_en,
+                geojson=geojson,
+                featureidkey='properties.name',
                 locations='Province_EN',
-                locationmode='country names',
-                scope='asia',
                 color='数字化转型指数(0-100分)',
                 hover_name='省份',
                 hover_data={'Province_EN': False, '数字化转型指数(0-100分)': ':.1f'},
@@ -547,24 +346,9 @@ if df is not None:
                 color_continuous_scale='Blues',
                 range_color=[0, 100]
             )
-            
-            # 增强地图视觉效果
-            fig.update_geos(
-                center={'lat': 35, 'lon': 105},
-                projection_scale=5,
-                visible=False,
-                showcountries=True,
-                countrycolor='#444444',
-                showcoastlines=True,
-                coastlinecolor='#999999',
-                showland=True,
-                landcolor='#f8f9fa',
-                showlakes=True,
-                lakecolor='#e3f2fd',
-                resolution=50  # 提高地图分辨率
-            )
-            
-            # 美化布局
+
+            # 只绘制省界，不加载底图
+            fig.update_geos(fitbounds='locations', visible=False)
             fig.update_layout(
                 title={
                     'text': f'{map_year}年各省份数字化转型指数分布',
@@ -574,11 +358,6 @@ if df is not None:
                     'yanchor': 'top',
                     'font': {'size': 20, 'color': '#333333'}
                 },
-                geo=dict(
-                    fitbounds='locations',
-                    lataxis=dict(range=[18, 53]),
-                    lonaxis=dict(range=[73, 135])
-                ),
                 coloraxis_colorbar={
                     'title': '指数值',
                     'tickformat': '.0f',
@@ -596,11 +375,258 @@ if df is not None:
                 },
                 margin={'r': 20, 'l': 20, 't': 60, 'b': 20}
             )
-            
-            st.plotly_chart(fig, width='stretch')
+
+            return fig
         else:
-            st.info("当前筛选条件下没有可显示在地图上的省份数据")
+            return "当前筛选条件下没有可显示在地图上的省份数据"
     else:
-        st.info("当前筛选条件下没有足够的数据生成地图")
-        
+        return "当前筛选条件下没有足够的数据生成地图"
+
+
+def build_movers_figure(gainers, decliners, year, metric):
+    """指数变动榜的横向柱状图：上升的企业为绿色，下降的为红色"""
+    movers = pd.concat([gainers, decliners[::-1]])
+    movers['方向'] = np.where(movers[metric] > 0, '上升', '下降')
+    fig = px.bar(
+        movers[::-1],
+        x=metric,
+        y='企业名称',
+        orientation='h',
+        color='方向',
+        color_discrete_map={'上升': '#2ca02c', '下降': '#d62728'},
+        hover_data={'股票代码': True, '上年指数': True, '本年指数': True, '方向': False},
+        title=f'{year}年{metric}最大的企业'
+    )
+    fig.update_layout(
+        yaxis=dict(title='', categoryorder='array', categoryarray=list(movers['企业名称'][::-1])),
+        plot_bgcolor='#f9f2f4',
+        paper_bgcolor='#f9f2f4',
+        font=dict(family='Arial', size=12),
+        title_x=0.5,
+        height=max(400, 24 * len(movers))
+    )
+    return fig
+
+
+def show_figure(plan, name, build, columns, *extra, overrides=None):
+    """从缓存取出图表并显示；键只包含该图表依赖的筛选条件
+
+    开启诊断时记录该图表的耗时、依赖的筛选条件下的行数以及序列化后的字节数。
+    """
+    key = (name, plan.dataset.version, filter_key(plan.state, columns)) + extra
+    recorder = plan.recorder
+    with recorder.span(name) as span:
+        result = get_figure_cache().get(key, build)
+        if recorder.enabled:
+            # overrides 中的列（如地图的单一年份）也参与计数
+            span.rows = plan.count([*columns, *(overrides or {})], overrides)
+            span.bytes = figure_size(result)
+    if isinstance(result, str):
+        st.info(result)
+    elif result is not None:
+        st.plotly_chart(result, width='stretch')
+
+
+# ----------------------
+# 页面区块：每个区块是一个 fragment，区块内的控件（如排名页码）只重新运行该区块；
+# 筛选条件提交后整页重新运行，各图表再按自己依赖的筛选条件命中缓存
+# ----------------------
+ALL_FILTERS = ['年份', '行业名称', '省份', '企业名称', '股票代码']
+
+
+@st.fragment
+def overview_section(plan):
+    """数据概览指标"""
+    # 只需要行数和指数的均值、最大值、最小值，不取出筛选后的行（SQL 后端为一次聚合查询）
+    with plan.recorder.span('数据概览') as span:
+        summary = plan.summary('数据概览', ALL_FILTERS)
+        span.rows = summary['rows']
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("企业数量", summary['rows'])
+    
+    if summary['rows'] == 0:
+        st.warning("当前筛选条件下没有数据")
+    else:
+        with col2:
+            st.metric("平均指数", f"{summary['mean']:.1f}")
+        with col3:
+            st.metric("最高指数", int(summary['max']))
+        with col4:
+            st.metric("最低指数", int(summary['min']))
+
+
+@st.fragment
+def analysis_section(plan):
+    """指数分布与年度趋势"""
+    st.subheader("数字化转型指数分析")
+    
+    # 创建两列布局
+    col_left, col_right = st.columns(2)
+    
+    with col_left:
+        # 左侧：指数分布直方图
+        show_figure(plan, '指数分布', lambda: build_distribution_figure(plan), ALL_FILTERS)
+    
+    with col_right:
+        # 右侧：指数年度趋势图
+        show_figure(plan, '年度趋势', lambda: build_trend_figure(plan), ['行业名称', '省份', '企业名称', '股票代码'])
+
+
+@st.fragment
+def ranking_section(plan, page_size=20):
+    """企业排名表格（服务端分页，每页只取出当前页的行）；翻页只重新运行本区块"""
+    st.subheader("企业排名")
+    page = st.session_state.get('ranking_page', 1)
+    with plan.recorder.span('企业排名') as span:
+        page_df, total_rows = plan.ranking_frame('企业排名', ALL_FILTERS, page_size, (page - 1) * page_size)
+        page_count = (total_rows + page_size - 1) // page_size
+        if total_rows and page > page_count:
+            # 筛选结果变少时把页码收回到有效范围内
+            page = page_count
+            page_df, _ = plan.ranking_frame('企业排名', ALL_FILTERS, page_size, (page - 1) * page_size)
+        span.rows = total_rows
+    if not total_rows:
+        return
+    st.session_state['ranking_page'] = page
+    st.number_input("页码", min_value=1, max_value=page_count, step=1, key='ranking_page')
+    offset = (page - 1) * page_size
+    display_df = page_df[['股票代码', '企业名称', '省份', '行业名称', '数字化转型指数(0-100分)', '总词频数']]
+    display_df.insert(0, '排名', range(offset + 1, offset + len(display_df) + 1))
+    st.dataframe(display_df, width='stretch')
+    st.caption(f"共 {total_rows} 条记录，第 {page}/{page_count} 页")
+
+
+@st.fragment
+def industry_section(plan, selected_years):
+    """行业对比分析"""
+    st.subheader("行业对比分析")
+    show_figure(plan, '行业对比', lambda: build_industry_figure(plan, selected_years), ['年份', '省份'])
+
+
+@st.fragment
+def province_section(plan, selected_years):
+    """省份对比分析"""
+    st.subheader("省份对比分析")
+    show_figure(plan, '省份对比', lambda: build_province_figure(plan, selected_years), ['年份', '行业名称'])
+
+
+@st.fragment
+def map_section(plan, map_year):
+    """数字化转型指数地图分布"""
+    st.subheader("数字化转型指数地理分布")
+    show_figure(plan, '地理分布', lambda: build_map_figure(plan, map_year), ['行业名称', '企业名称', '股票代码'], map_year,
+                overrides={'年份': [map_year]})
 
+
+MOVER_FILTERS = ['行业名称', '省份', '企业名称', '股票代码']
+
+
+@st.fragment
+def movers_section(plan, year):
+    """某年相对上年指数变动最大的企业；切换排序依据只重新运行本区块"""
+    st.subheader("企业指数变动")
+    metric = st.radio("排序依据", list(MOVER_METRICS), horizontal=True, key='movers_metric')
+    with plan.recorder.span('指数变动数据') as span:
+        gainers, decliners = plan.movers('指数变动', year, metric, MOVER_FILTERS)
+        span.rows = len(gainers) + len(decliners)
+    if gainers.empty and decliners.empty:
+        st.info(f"当前筛选条件下没有{year}年可与上年比较的企业数据")
+        return
+    show_figure(plan, '指数变动', lambda: build_movers_figure(gainers, decliners, year, metric),
+                MOVER_FILTERS, year, metric, overrides={'年份': [year]})
+    col_up, col_down = st.columns(2)
+    with col_up:
+        st.markdown(f"**{year}年上升最多**")
+        st.dataframe(gainers.reset_index(drop=True).round(1), width='stretch')
+    with col_down:
+        st.markdown(f"**{year}年下降最多**")
+        st.dataframe(decliners.reset_index(drop=True).round(1), width='stretch')
+
+
+# 运行诊断（默认关闭，见 utils/diagnostics.py）：页面主体在记录器的上下文中运行，
+# 提前结束（加载失败、异常、st.stop() 或重新运行）时也会停止分析器并写出记录
+with start_rerun(diagnostics_mode(st.query_params),
+                 st.session_state.setdefault('diagnostics_session', uuid.uuid4().hex)) as recorder:
+
+    # 加载数据
+    with recorder.span('load_data') as span:
+        dataset = load_data()
+        if recorder.enabled and dataset is not None:
+            span.rows = len(dataset)
+
+    if dataset is not None:
+    
+        # 应用标题
+        st.title("数字化转型指数分析平台")
+        st.markdown("---")
+    
+        years = dataset.values('年份')
+    
+        # 侧边栏筛选器：放在表单中，输入过程中不触发重新运行，点击“应用筛选”后一次性提交
+        with st.sidebar.form('filters'):
+            st.header("数据筛选")
+        
+            # 股票代码搜索（支持多个，用逗号分隔）
+            stock_codes = st.text_input("股票代码（多个用逗号分隔）")
+        
+            # 年份筛选（支持多选）
+            default_years = [2021]  # 默认选择有完整数据的年份
+            selected_years = st.multiselect("选择年份", years, default=default_years)
+        
+            # 行业筛选（支持多选）
+            industries = dataset.values('行业名称')
+            selected_industries = st.multiselect("选择行业（可多选）", industries)
+        
+            # 省份筛选（支持多选）
+            provinces = dataset.values('省份')
+            selected_provinces = st.multiselect("选择省份（可多选）", provinces)
+        
+            # 企业名称搜索（支持多个，用逗号分隔）
+            company_names = st.text_input("企业名称（多个用逗号分隔）")
+        
+            st.form_submit_button("应用筛选", type='primary', width='stretch')
+    
+        # 年份提示
+        if any(year > 2021 for year in selected_years):
+            st.sidebar.warning("⚠️ 提示：2022年后行业数据不完整，建议查看2021年及之前的数据")
+    
+        # 本次提交的筛选计划：每个筛选条件只计算一次，各区块按需组合
+        plan = dataset.plan({
+            '年份': selected_years,
+            '行业名称': selected_industries,
+            '省份': selected_provinces,
+            '企业名称': parse_terms(company_names),
+            '股票代码': parse_terms(stock_codes),
+        }, recorder)
+    
+        # 主内容区域
+        with st.container():
+            overview_section(plan)
+            analysis_section(plan)
+    
+        ranking_section(plan)
+        industry_section(plan, selected_years)
+        province_section(plan, selected_years)
+        # 选择了多个年份时使用最新年份
+        latest_year = max(selected_years) if selected_years else max(years)
+        map_section(plan, latest_year)
+        movers_section(plan, latest_year)
+    
+        # 诊断信息：开启诊断时显示本次运行各区块的耗时、行数和图表大小；
+        # 始终显示各区块的取数耗时与图表缓存命中情况，用于确认筛选条件没有被重复计算
+        record = recorder.finish()
+        with st.expander("诊断信息", expanded=False):
+            if record is None:
+                st.caption(f"在页面地址后加 ?diagnostics=1（或设置环境变量 {DIAGNOSTICS_ENV}=1）可查看本次运行各区块的耗时、"
+                           "处理行数和图表大小；?diagnostics=profile 同时记录 cProfile")
+            else:
+                spans_df = pd.DataFrame(record['spans']).rename(
+                    columns={'name': '区块', 'ms': '耗时(ms)', 'rows': '行数', 'bytes': '图表字节数'})
+                st.dataframe(spans_df, width='stretch')
+                st.caption(f"本次运行共 {record['total_ms']:.1f} ms")
+                if record['profile']:
+                    st.caption(f"cProfile 结果已写入 {record['profile']}")
+                    st.code(recorder.profile_summary())
+            st.json({**plan.report(), 'figure_cache': get_figure_cache().stats(), 'data_reload': get_data_watcher().status()})
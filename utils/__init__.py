@@ -0,0 +1 @@
+"""数字化转型指数分析平台的辅助工具函数"""
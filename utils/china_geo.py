@@ -0,0 +1,206 @@
+"""中国省级行政区 GeoJSON：离线加载与按缩放选择精度
+
+地图原先用 locationmode='country names' 按拼音省名匹配 Plotly 内置的世界地图，
+省份无法正确显示，且每次都要加载整张世界地图。这里改为读取 geo/ 目录中的本地省界文件。
+项目不附带省界数据，部署时自行放入（如 Natural Earth admin-1，公有领域）：
+
+- ``geo/china_provinces.<级别>.geojson``，级别为 SIMPLIFY_LEVELS 中的 low / medium / high，
+  分别为按对应容差预先简化的版本（可用 mapshaper 等工具生成），至少放一个级别；
+- 读取时按 NAME_FIELDS 中的属性识别省份，统一以拼音省名为要素 id，无法识别的要素（如港澳台）忽略；
+- 地图缩放到有数据的省份（fitbounds），页面按这些省份的经纬度范围和地图尺寸算出一个像素
+  对应的度数，选择最粗但不失真的一级（容差不超过一个像素）：显示全国时用粗的一级，筛选后
+  只剩少数几个省份、地图放大时换用更细的一级。各级文件每个进程只读取一次。
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+GEO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'geo')
+GEO_FILE_PATTERN = 'china_provinces.{level}.geojson'
+
+# 各级省界文件的简化容差（经纬度），按从粗到细排列
+SIMPLIFY_LEVELS = {
+    'low': 0.08,
+    'medium': 0.02,
+    'high': 0.005,
+}
+
+# 地图的大致显示尺寸（像素，宽度为页面主区域宽度、高度为 Plotly 默认高度），
+# 与地图实际显示的省份范围一起决定省界的简化级别
+MAP_WIDTH_PX = 1200
+MAP_HEIGHT_PX = 450
+
+# 中国大陆的经度跨度（约 73°E - 135°E），用于把地图像素宽度换算为每像素的经度
+CHINA_SPAN_DEG = 62
+
+# 省份名称与地图要素 id（拼音）的对应关系
+PROVINCE_PINYIN = {
+    '北京': 'Beijing',
+    '上海': 'Shanghai',
+    '广东': 'Guangdong',
+    '江苏': 'Jiangsu',
+    '浙江': 'Zhejiang',
+    '山东': 'Shandong',
+    '河北': 'Hebei',
+    '河南': 'Henan',
+    '湖北': 'Hubei',
+    '湖南': 'Hunan',
+    '四川': 'Sichuan',
+    '陕西': 'Shaanxi',
+    '安徽': 'Anhui',
+    '福建': 'Fujian',
+    '江西': 'Jiangxi',
+    '广西': 'Guangxi',
+    '云南': 'Yunnan',
+    '贵州': 'Guizhou',
+    '辽宁': 'Liaoning',
+    '吉林': 'Jilin',
+    '黑龙江': 'Heilongjiang',
+    '天津': 'Tianjin',
+    '重庆': 'Chongqing',
+    '山西': 'Shanxi',
+    '内蒙古': 'Nei Mongol',
+    '西藏': 'Xizang',
+    '新疆': 'Xinjiang',
+    '青海': 'Qinghai',
+    '甘肃': 'Gansu',
+    '宁夏': 'Ningxia',
+    '海南': 'Hainan'
+}
+PINYIN_PROVINCE = {pinyin: name for name, pinyin in PROVINCE_PINYIN.items()}
+
+# 省界数据中常见的其他写法
+PROVINCE_ALIASES = {
+    'Inner Mongolia': 'Nei Mongol',
+    'Tibet': 'Xizang',
+    'Shensi': 'Shaanxi',
+}
+
+# 省界数据中可能保存省名的属性，依次尝试
+NAME_FIELDS = ('name', 'name_zh', 'NAME_1', 'name_en', 'NL_NAME_1')
+
+_CHINESE_SUFFIX = re.compile(r'(壮族自治区|回族自治区|维吾尔自治区|自治区|特别行政区|省|市)$')
+
+
+def province_id(properties, fields=NAME_FIELDS):
+    """从要素属性中识别省份，返回拼音 id；无法识别（如港澳台）时返回 None"""
+    for field in fields:
+        value = properties.get(field)
+        if not isinstance(value, str):
+            continue
+        value = value.strip()
+        if value in PINYIN_PROVINCE:
+            return value
+        if value in PROVINCE_ALIASES:
+            return PROVINCE_ALIASES[value]
+        chinese = _CHINESE_SUFFIX.sub('', value)
+        if chinese in PROVINCE_PINYIN:
+            return PROVINCE_PINYIN[chinese]
+        # 如 'Xinjiang Uygur'、'Ningxia Hui'
+        first_word = value.split(' ')[0]
+        if first_word in PINYIN_PROVINCE:
+            return first_word
+    return None
+
+
+def _rings(geometry):
+    """把 Polygon / MultiPolygon 拆成多边形列表，每个多边形是若干个不含闭合点的环"""
+    if geometry is None:
+        return []
+    if geometry['type'] == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        return []
+    result = []
+    for polygon in polygons:
+        rings = []
+        for ring in polygon:
+            ring = [(float(x), float(y)) for x, y, *_ in ring]
+            if len(ring) > 1 and ring[0] == ring[-1]:
+                ring = ring[:-1]
+            if len(ring) >= 3:
+                rings.append(ring)
+        if rings:
+            result.append(rings)
+    return result
+
+
+def geo_path(level, geo_dir=GEO_DIR):
+    return os.path.join(geo_dir, GEO_FILE_PATTERN.format(level=level))
+
+
+def available_levels(geo_dir=GEO_DIR):
+    """geo 目录中已有的级别，按从粗到细排列"""
+    return [level for level in SIMPLIFY_LEVELS if os.path.exists(geo_path(level, geo_dir))]
+
+
+def feature_bounds(geojson):
+    """各要素的经纬度范围：{id: (最小经度, 最小纬度, 最大经度, 最大纬度)}"""
+    bounds = {}
+    for feature in geojson['features']:
+        points = [point for polygon in _rings(feature['geometry']) for ring in polygon for point in ring]
+        if points:
+            x, y = np.asarray(points, dtype=np.float64).T
+            bounds[feature['properties']['name']] = (x.min(), y.min(), x.max(), y.max())
+    return bounds
+
+
+def visible_span(bounds, ids, width_px, height_px):
+    """地图缩放到 ids 这些省份后，相当于显示宽度上的经度跨度（纬度方向更“满”时按宽高比折算）
+
+    没有可用的范围时返回全国的经度跨度。
+    """
+    boxes = [bounds[i] for i in ids if i in bounds]
+    if not boxes:
+        return CHINA_SPAN_DEG
+    min_x, min_y, max_x, max_y = np.asarray(boxes).T
+    lon_span = max_x.max() - min_x.min()
+    lat_span = max_y.max() - min_y.min()
+    return max(lon_span, lat_span * width_px / max(height_px, 1))
+
+
+def pick_level(width_px, span_deg=CHINA_SPAN_DEG, geo_dir=GEO_DIR):
+    """按地图显示宽度和显示的经度跨度选择最粗但不失真的级别（容差不超过一个像素对应的经度）
+
+    没有可用文件时返回 None。
+    """
+    levels = available_levels(geo_dir)
+    if not levels:
+        return None
+    degrees_per_px = span_deg / max(width_px, 1)
+    fitting = [level for level in levels if SIMPLIFY_LEVELS[level] <= degrees_per_px]
+    return fitting[0] if fitting else levels[-1]
+
+
+def load_provinces(level, geo_dir=GEO_DIR, fields=NAME_FIELDS):
+    """读取指定级别的省界 GeoJSON，文件不存在时返回 None
+
+    返回的要素只保留能识别的省份，properties.name 统一为拼音省名（地图的 featureidkey）。
+    """
+    path = geo_path(level, geo_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        source = json.load(f)
+    # 同一省份分成多个要素时合并为一个 MultiPolygon
+    polygons = {}
+    for feature in source.get('features', []):
+        pid = province_id(feature.get('properties') or {}, fields)
+        geometry = feature.get('geometry') or {}
+        if pid is None:
+            continue
+        if geometry.get('type') == 'Polygon':
+            polygons.setdefault(pid, []).append(geometry['coordinates'])
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons.setdefault(pid, []).extend(geometry['coordinates'])
+    features = [{
+        'type': 'Feature',
+        'id': pid,
+        'properties': {'name': pid, 'name_zh': PINYIN_PROVINCE[pid]},
+        'geometry': {'type': 'MultiPolygon', 'coordinates': coordinates},
+    } for pid, coordinates in sorted(polygons.items())]
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,122 @@
+"""年份 × 行业 × 省份的预聚合数据立方体
+
+加载数据时按 (年份, 行业名称, 省份) 分组，一次性物化数字化转型指数的
+合计、计数、最小值和最大值。趋势图、行业与省份 Top10 以及地图只需在这些
+分组上再聚合（均值 = 合计 / 计数），每次运行的开销从“行数”降为“分组数”。
+
+每个分组还保存了指数的分布（0-100 分每分一个桶，只保存非零的桶），分布图只需把
+选中分组的桶相加，传给浏览器的数据固定为 101 个计数，与筛选出的行数无关。
+"""
+import numpy as np
+import pandas as pd
+
+from utils.filter_engine import FILTER_COLUMNS
+
+INDEX_COLUMN = '数字化转型指数(0-100分)'
+
+# 分布图的桶数：0-100 分每个整数分一个桶
+HISTOGRAM_BINS = 101
+
+
+def histogram_bins(values):
+    """每个指数值所在的桶：四舍五入到整数分，并截断到 0-100"""
+    return np.clip(np.rint(values), 0, HISTOGRAM_BINS - 1).astype(np.int64)
+
+
+def index_histogram(values, weights=None):
+    """指数值的分布：各整数分上的记录数（缺失值不计），长度固定为 HISTOGRAM_BINS"""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)[valid]
+    counts = np.bincount(histogram_bins(values[valid]), weights=weights, minlength=HISTOGRAM_BINS)
+    return counts.astype(np.int64)
+
+
+class IndexCube:
+    """按筛选维度预聚合的指数统计量"""
+
+    def __init__(self, df, filters, dims=FILTER_COLUMNS, value_column=INDEX_COLUMN):
+        self.dims = tuple(dims)
+        self.value_column = value_column
+        self._values = {dim: pd.Index(filters.values(dim)) for dim in self.dims}
+        self._positions = {dim: {value: i for i, value in enumerate(self._values[dim])}
+                           for dim in self.dims}
+
+        codes = [filters.codes(dim) for dim in self.dims]
+        values = df[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+        # 与 groupby().mean() 一致：忽略指数缺失或维度缺失的行
+        valid = ~np.isnan(values)
+        for dim_codes in codes:
+            valid &= dim_codes >= 0
+        values = values[valid]
+        shape = [len(self._values[dim]) for dim in self.dims]
+        flat = np.ravel_multi_index([dim_codes[valid] for dim_codes in codes], shape)
+        group_ids, inverse = np.unique(flat, return_inverse=True)
+
+        self.group_codes = dict(zip(self.dims, np.unravel_index(group_ids, shape)))
+        self.sum = np.bincount(inverse, weights=values, minlength=len(group_ids))
+        self.count = np.bincount(inverse, minlength=len(group_ids))
+        self.min = np.full(len(group_ids), np.inf)
+        self.max = np.full(len(group_ids), -np.inf)
+        np.minimum.at(self.min, inverse, values)
+        np.maximum.at(self.max, inverse, values)
+
+        # 各分组的指数分布，按 CSR 形式保存非零的桶：
+        # 分组 g 的桶为 bin_ids[bin_offsets[g]:bin_offsets[g+1]]，对应记录数为 bin_counts 的同一区间
+        pairs, pair_counts = np.unique(inverse * HISTOGRAM_BINS + histogram_bins(values), return_counts=True)
+        self.bin_ids = (pairs % HISTOGRAM_BINS).astype(np.uint8)
+        self.bin_counts = pair_counts
+        self.bin_offsets = np.searchsorted(pairs // HISTOGRAM_BINS, np.arange(len(group_ids) + 1))
+
+    def __len__(self):
+        return len(self.sum)
+
+    def _group_mask(self, selections):
+        mask = np.ones(len(self), dtype=bool)
+        for dim, selected in (selections or {}).items():
+            if not selected:
+                continue
+            positions = self._positions[dim]
+            idx = [positions[value] for value in selected if value in positions]
+            mask &= np.isin(self.group_codes[dim], idx)
+        return mask
+
+    def histogram(self, selections=None):
+        """满足 selections 的分组上各整数分的记录数，长度固定为 HISTOGRAM_BINS"""
+        mask = np.repeat(self._group_mask(selections), np.diff(self.bin_offsets))
+        counts = np.bincount(self.bin_ids[mask], weights=self.bin_counts[mask], minlength=HISTOGRAM_BINS)
+        return counts.astype(np.int64)
+
+    def aggregate(self, by, selections=None, stats=('mean',)):
+        """在满足 selections 的分组上按 by 再聚合，返回按 by 排序的 DataFrame
+
+        stats 可选 mean、sum、count、min、max；只有 mean 时列名沿用指数列名，
+        与原始数据上 groupby(by)[指数列].mean() 的结果形状一致。
+        """
+        mask = self._group_mask(selections)
+        keys = self.group_codes[by][mask]
+        size = len(self._values[by])
+        count = np.bincount(keys, weights=self.count[mask], minlength=size)
+        present = count > 0
+        total = np.bincount(keys, weights=self.sum[mask], minlength=size)
+
+        columns = {}
+        for stat in stats:
+            if stat == 'mean':
+                column = self.value_column if list(stats) == ['mean'] else 'mean'
+                columns[column] = total[present] / count[present]
+            elif stat == 'sum':
+                columns['sum'] = total[present]
+            elif stat == 'count':
+                columns['count'] = count[present].astype(np.int64)
+            elif stat in ('min', 'max'):
+                ufunc = np.minimum if stat == 'min' else np.maximum
+                extreme = np.full(size, np.inf if stat == 'min' else -np.inf)
+                ufunc.at(extreme, keys, getattr(self, stat)[mask])
+                columns[stat] = extreme[present]
+            else:
+                raise ValueError(f'不支持的统计量: {stat}')
+        result = pd.DataFrame(columns)
+        result.insert(0, by, self._values[by][present])
+        return result
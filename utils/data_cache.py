@@ -0,0 +1,124 @@
+"""数据文件的列式旁路缓存
+
+首次读取 Excel 后，把处理好的数据（含派生列）写成同目录下的 Parquet 文件，
+并在文件元数据中记录源工作簿的修改时间、大小与 SHA-256 摘要。之后只要
+工作簿没有变化，就直接读取 Parquet，跳过 openpyxl 解析；工作簿一旦更新，
+缓存会自动重建。未安装 pyarrow 时退回到直接读取 Excel。
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 为可选依赖
+    pa = None
+    pq = None
+
+# 缓存格式版本：派生列的计算方式发生变化时递增，旧缓存会自动失效
+CACHE_VERSION = 3
+
+# 可通过环境变量把缓存文件放到其他目录（例如数据目录只读时）
+CACHE_DIR_ENV = 'DT_INDEX_CACHE_DIR'
+
+_METADATA_KEY = b'dt_index_cache'
+
+
+def cache_path_for(source_path, suffix='.cache.parquet'):
+    """返回源工作簿对应的缓存文件路径；suffix 区分不同类型的缓存（如数据库文件）"""
+    directory, filename = os.path.split(os.path.abspath(source_path))
+    directory = os.environ.get(CACHE_DIR_ENV) or directory
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, f'{stem}{suffix}')
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """分块计算文件的 SHA-256 摘要"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_cache_metadata(cache_path):
+    """读取缓存文件中记录的源文件信息，缓存不存在或损坏时返回 None"""
+    if pq is None or not os.path.exists(cache_path):
+        return None
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+        return json.loads(metadata[_METADATA_KEY])
+    except Exception:
+        return None
+
+
+def is_cache_valid(meta, source_path, stat, key):
+    """判断缓存是否对应当前的源文件；修改时间和大小不变时免去计算摘要"""
+    if meta is None or meta.get('version') != CACHE_VERSION or meta.get('key') != key:
+        return False
+    if meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+        return True
+    # 修改时间变了但内容可能没变（例如重新拷贝），以摘要为准
+    return meta.get('sha256') == file_sha256(source_path)
+
+
+def write_cache(df, cache_path, meta):
+    """原子地写入缓存文件，写入失败（如目录只读）时静默跳过"""
+    if pa is None:
+        return False
+    directory = os.path.dirname(cache_path)
+    tmp_path = None
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        schema_metadata = dict(table.schema.metadata or {})
+        schema_metadata[_METADATA_KEY] = json.dumps(meta).encode('utf-8')
+        table = table.replace_schema_metadata(schema_metadata)
+        fd, tmp_path = tempfile.mkstemp(suffix='.parquet.tmp', dir=directory)
+        os.close(fd)
+        os.chmod(tmp_path, 0o644)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, cache_path)
+        tmp_path = None
+        return True
+    except (OSError, pa.ArrowException):
+        return False
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_cached_frame(source_path, prepare, key=''):
+    """读取工作簿并完成派生列计算，优先使用有效的 Parquet 缓存
+
+    prepare 接收 read_excel 得到的原始 DataFrame，返回处理后的 DataFrame；
+    key 用于区分不同的处理规则，规则变化时传入不同的值即可让缓存失效。
+    """
+    stat = os.stat(source_path)
+    cache_path = cache_path_for(source_path)
+    meta = read_cache_metadata(cache_path)
+    if is_cache_valid(meta, source_path, stat, key):
+        try:
+            return pq.read_table(cache_path).to_pandas()
+        except Exception:
+            pass  # 缓存损坏时退回 Excel 并重建
+
+    sha256 = file_sha256(source_path) if pa is not None else None
+    df = prepare(pd.read_excel(source_path))
+    write_cache(df, cache_path, source_metadata(source_path, stat, key, sha256))
+    return df
+
+
+def source_metadata(source_path, stat, key='', sha256=None):
+    """缓存中记录的源文件信息，供 is_cache_valid 判断缓存是否过期"""
+    return {
+        'version': CACHE_VERSION,
+        'key': key,
+        'source': os.path.basename(source_path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': sha256,
+    }
@@ -0,0 +1,140 @@
+"""数字化转型指数数据的加载与派生结构
+
+``prepare_frame`` 在原始工作簿数据上计算派生列；``IndexDataset`` 把处理后的
+DataFrame 与加载时一次性构建的查询结构（筛选位图索引、预聚合立方体、排名索引、企业名称与股票代码索引、
+企业 × 年份面板）放在一起，
+页面代码只读使用。
+
+数据集在每个进程中只构建一份，由所有会话共享（``st.cache_resource``），不再像
+``st.cache_data`` 那样每次重新运行都反序列化出一份副本。构建完成后所有 NumPy 数组
+都被设为只读；``IndexDataset.df`` 返回不复制数据的浅拷贝，配合 pandas 的写时复制
+（Copy-on-Write），页面代码对它的修改只会作用在自己的副本上，不会影响共享的数据。
+
+数据量超出内存时，可通过环境变量 ``DT_INDEX_BACKEND`` 改用嵌入式数据库执行查询
+（见 ``utils/sql_backend.py``），``open_dataset`` 按配置返回相应的数据集。
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.cube import IndexCube
+from utils.data_cache import load_cached_frame
+from utils.filter_engine import FilterEngine
+from utils.filter_plan import FilterPlan
+from utils.memory import compact_frame
+from utils.panel import FirmPanel
+from utils.province import resolve_provinces, rules_fingerprint
+from utils.ranking import RankingIndex
+from utils.stock_code import StockCodeIndex, normalize_stock_codes
+from utils.text_index import NgramIndex
+
+# 查询后端：pandas（默认，全部在内存中）、sqlite 或 duckdb
+BACKEND_ENV = 'DT_INDEX_BACKEND'
+BACKENDS = ('pandas', 'sqlite', 'duckdb')
+DEFAULT_BACKEND = 'pandas'
+
+
+def prepare_frame(df, compact=True):
+    """在原始数据上计算派生列：股票代码、省份及补全后的行业字段
+
+    compact 为 True 时再把各列转换为紧凑类型（分类文本、窄整数，见 ``utils/memory.py``）。
+    """
+    # Excel 把代码读成整数时会丢掉前导零，统一补齐为 6 位
+    df['股票代码'] = normalize_stock_codes(df['股票代码']).fillna('未知')
+    df['年份'] = df['年份'].astype(int)
+
+    # 从企业名称提取省份信息（只解析去重后的企业名称）
+    df['省份'] = resolve_provinces(df['企业名称'])
+
+    # 确保行业名称不为空
+    df['行业名称'] = df['行业名称'].fillna('未知行业')
+    df['行业代码'] = df['行业代码'].fillna('未知')
+
+    if compact:
+        compact_frame(df)
+    return df
+
+
+def load_frame(path):
+    """读取工作簿并计算派生列；工作簿或省份规则未变化时直接读取 Parquet 缓存"""
+    return load_cached_frame(path, prepare_frame, key=rules_fingerprint())
+
+
+def _freeze_arrays(value):
+    """把 value 中的 NumPy 数组（连同其底层数组）设为只读，递归处理字典、列表和查询结构"""
+    if isinstance(value, np.ndarray):
+        while isinstance(value, np.ndarray):
+            value.setflags(write=False)
+            value = value.base
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze_arrays(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _freeze_arrays(item)
+    elif hasattr(value, '__dict__') and not isinstance(value, type):
+        _freeze_arrays(vars(value))
+
+
+def _freeze_frame(df):
+    """把 DataFrame 各列底层的 NumPy 数组设为只读（Arrow 字符串列本身不可变）"""
+    for column in df.columns:
+        values = df[column].array
+        if isinstance(values, pd.Categorical):
+            _freeze_arrays(values.codes)
+        elif isinstance(df[column].dtype, np.dtype):
+            _freeze_arrays(df[column].to_numpy())
+
+
+class IndexDataset:
+    """处理后的数据及其派生查询结构，构建一次后只读使用"""
+
+    backend = 'pandas'
+
+    def __init__(self, df):
+        self._df = df.reset_index(drop=True)
+        self.filters = FilterEngine(self._df)
+        self.cube = IndexCube(self._df, self.filters)
+        self.ranking = RankingIndex(self._df, self.filters)
+        self.names = NgramIndex(self._df['企业名称'])
+        self.codes = StockCodeIndex(self._df['股票代码'])
+        self.panel = FirmPanel.from_frame(self._df)
+        _freeze_frame(self._df)
+        for index in (self.filters, self.cube, self.ranking, self.names, self.codes, self.panel):
+            _freeze_arrays(index)
+
+    @property
+    def df(self):
+        """共享数据的浅拷贝：不复制数据，对它的修改不会影响其他会话"""
+        return self._df.copy(deep=False)
+
+    @classmethod
+    def from_path(cls, path):
+        return cls(load_frame(path))
+
+    def values(self, column):
+        """某一筛选列所有取值（已排序），用作侧边栏选项"""
+        return self.filters.values(column)
+
+    def plan(self, state, recorder=None):
+        """本次页面运行的筛选计划；recorder 为诊断记录器（见 utils/diagnostics.py）"""
+        return FilterPlan(self, state, recorder)
+
+    def __len__(self):
+        return len(self._df)
+
+
+def open_dataset(path, backend=None, snapshot=False):
+    """按配置的查询后端打开数据集；未指定时读取环境变量 DT_INDEX_BACKEND，默认 pandas
+
+    snapshot 为 True 时 SQL 后端通过数据库文件的快照打开（见 ``SqlDataset.from_path``），
+    数据文件更新、数据库被重建后本数据集不受影响；pandas 后端的数据本来就在内存中。
+    """
+    backend = (backend or os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f'不支持的查询后端: {backend}（可选: {", ".join(BACKENDS)}）')
+    if backend == 'pandas':
+        return IndexDataset.from_path(path)
+    from utils.sql_backend import SqlDataset
+    return SqlDataset.from_path(path, backend, key=rules_fingerprint(), snapshot=snapshot)
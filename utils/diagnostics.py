@@ -0,0 +1,198 @@
+"""可选的运行诊断：各区块耗时、处理行数、图表大小与 cProfile
+
+默认关闭。关闭时页面使用空操作的 ``NULL_RECORDER``：不计时、不统计行数、不序列化图表，
+也不启动分析器。通过环境变量 ``DT_INDEX_DIAGNOSTICS`` 或页面地址参数 ``?diagnostics=`` 开启：
+
+- ``1`` / ``true`` / ``on``：记录每次运行中数据加载、各筛选条件、各图表和排名表的耗时、
+  处理行数和图表序列化后的字节数，显示在页面底部的“诊断信息”中，并为每次运行写出一行
+  JSON 格式的日志（logger 名为 ``dt_index.diagnostics``）；
+- ``profile``：同时用 cProfile 分析整次运行，把 .prof 文件写入 ``DT_INDEX_PROFILE_DIR``
+  （默认为系统临时目录），可用 ``python -m pstats`` 或 snakeviz 查看。
+
+记录器是上下文管理器，页面主体写在 ``with start_rerun(...) as recorder:`` 中：运行因异常、
+``st.stop()`` 或 Streamlit 的重新运行而提前结束时，退出时也会停止分析器并写出记录。
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import tempfile
+import time
+from datetime import datetime
+
+DIAGNOSTICS_ENV = 'DT_INDEX_DIAGNOSTICS'
+DIAGNOSTICS_PARAM = 'diagnostics'
+PROFILE_DIR_ENV = 'DT_INDEX_PROFILE_DIR'
+LOGGER_NAME = 'dt_index.diagnostics'
+
+_ENABLED_VALUES = ('1', 'true', 'on', 'yes')
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def diagnostics_mode(query_params=None, environ=None):
+    """诊断模式：None（关闭）、'metrics' 或 'profile'；地址参数优先于环境变量"""
+    environ = os.environ if environ is None else environ
+    value = None
+    if query_params is not None:
+        value = query_params.get(DIAGNOSTICS_PARAM)
+    if value is None:
+        value = environ.get(DIAGNOSTICS_ENV)
+    value = (value or '').strip().lower()
+    if value == 'profile':
+        return 'profile'
+    if value in _ENABLED_VALUES:
+        return 'metrics'
+    return None
+
+
+class Span:
+    """一个被计时的区块：名称、耗时（毫秒）、处理行数、图表字节数"""
+
+    def __init__(self, name):
+        self.name = name
+        self.ms = None
+        self.rows = None
+        self.bytes = None
+
+    def to_dict(self):
+        return {'name': self.name, 'ms': self.ms, 'rows': self.rows, 'bytes': self.bytes}
+
+
+class _SpanContext:
+    def __init__(self, recorder, name):
+        self._recorder = recorder
+        self._span = Span(name)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self._span
+
+    def __exit__(self, *exc):
+        self._span.ms = round((time.perf_counter() - self._start) * 1000, 3)
+        self._recorder.spans.append(self._span)
+        return False
+
+
+class RerunRecorder:
+    """一次页面运行的诊断记录"""
+
+    enabled = True
+
+    def __init__(self, session=None, profile=False, profile_dir=None):
+        self.session = session
+        self.spans = []
+        self.profile_path = None
+        self.record = None
+        self._start = time.perf_counter()
+        self._profiler = None
+        self._profile_dir = profile_dir or os.environ.get(PROFILE_DIR_ENV) or tempfile.gettempdir()
+        if profile:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # 同一时刻只能有一个分析器（如另一个会话正在分析），本次运行不做分析
+                logger.warning('另一个分析器正在运行，本次运行不记录 cProfile')
+            else:
+                self._profiler = profiler
+
+    def span(self, name):
+        """计时区块：with recorder.span(name) as span: ...，可在区块内设置 span.rows / span.bytes"""
+        return _SpanContext(self, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish(exc_type.__name__ if exc_type is not None else None)
+        return False
+
+    def finish(self, interrupted_by=None):
+        """结束本次运行的记录：停止分析器、写出日志，返回本次运行的记录
+
+        可以多次调用，只有第一次生效；interrupted_by 为提前结束本次运行的异常名称。
+        """
+        if self.record is not None:
+            return self.record
+        if self._profiler is not None:
+            self._profiler.disable()
+            try:
+                os.makedirs(self._profile_dir, exist_ok=True)
+                stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+                self.profile_path = os.path.join(self._profile_dir, f'dt_index_rerun_{stamp}.prof')
+                self._profiler.dump_stats(self.profile_path)
+            except OSError as e:
+                logger.warning('无法写出 cProfile 结果: %s', e)
+                self.profile_path = None
+        record = {
+            'event': 'rerun',
+            'session': self.session,
+            'total_ms': round((time.perf_counter() - self._start) * 1000, 3),
+            'spans': [span.to_dict() for span in self.spans],
+            'profile': self.profile_path,
+        }
+        if interrupted_by is not None:
+            record['interrupted_by'] = interrupted_by
+        self.record = record
+        if not logger.handlers and not logging.getLogger().handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return record
+
+    def profile_summary(self, limit=20):
+        """按累计耗时排列的前 limit 个函数"""
+        if self._profiler is None:
+            return ''
+        output = io.StringIO()
+        pstats.Stats(self._profiler, stream=output).sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+
+class _NullSpan:
+    name = ms = rows = bytes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NullRecorder:
+    """关闭诊断时使用的空记录器：所有操作都不做任何事"""
+
+    enabled = False
+    spans = ()
+    profile_path = None
+    _span = _NullSpan()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def span(self, name):
+        return self._span
+
+    def finish(self, interrupted_by=None):
+        return None
+
+    def profile_summary(self, limit=20):
+        return ''
+
+
+NULL_RECORDER = _NullRecorder()
+
+
+def start_rerun(mode, session=None):
+    """按诊断模式开始记录一次运行；关闭时返回 NULL_RECORDER"""
+    if mode is None:
+        return NULL_RECORDER
+    return RerunRecorder(session, profile=mode == 'profile')
@@ -0,0 +1,97 @@
+"""按依赖的筛选条件缓存图表
+
+每次交互都会重新运行整个页面，但多数图表只依赖部分筛选条件，例如修改企业名称
+或股票代码不会改变行业、省份 Top10 柱状图。``FigureCache`` 以“图表名 + 该图表
+依赖的筛选条件（规范化后）”为键缓存构建好的图表，进程内所有会话共享：
+
+- 多选条件与顺序无关；企业名称不区分大小写，股票代码去掉交易所标记后比较；
+- 按图表序列化后的大小（字节）做 LRU 淘汰，总量不超过 max_bytes；
+- 记录命中、未命中和淘汰次数，便于在诊断信息中查看。
+
+缓存的图表由多个会话共用，取出后只用于展示，不应再修改。
+"""
+import threading
+from collections import OrderedDict
+
+from utils.stock_code import normalize_query_code
+
+FIGURE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _normalize(column, selected):
+    if column == '企业名称':
+        values = {term.lower() for term in selected}
+    elif column == '股票代码':
+        values = {normalize_query_code(term) for term in selected}
+    else:
+        values = set(selected)
+    return tuple(sorted(values, key=str))
+
+
+def filter_key(state, columns):
+    """图表依赖的筛选条件的规范化键；未设置的条件视为空"""
+    return tuple((column, _normalize(column, state.get(column) or ())) for column in columns)
+
+
+def figure_size(figure):
+    """图表序列化为 JSON 后的字节数；提示文字等非图表结果按字符串长度估算"""
+    if figure is None:
+        return 0
+    if hasattr(figure, 'to_json'):
+        return len(figure.to_json().encode('utf-8'))
+    return len(str(figure).encode('utf-8'))
+
+
+class FigureCache:
+    """按字节数淘汰的 LRU 图表缓存，线程安全"""
+
+    def __init__(self, max_bytes=FIGURE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """返回键对应的图表，未缓存时调用 build() 构建并缓存"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+        figure = build()
+        size = figure_size(figure)
+        with self._lock:
+            if key in self._entries:
+                # 其他会话已经构建了同一图表
+                return self._entries[key][0]
+            if size <= self.max_bytes:
+                self._entries[key] = (figure, size)
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self.total_bytes -= evicted_size
+                    self.evictions += 1
+        return figure
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """命中、未命中、淘汰次数以及当前缓存的图表数和字节数"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,71 @@
+"""侧边栏筛选的位图索引
+
+加载数据时为每个筛选列（年份、行业名称、省份）计算一次分类编码，并为每个取值
+保存一张按行压缩的位图（每行 1 bit）。任意侧边栏选择都只需对位图做按位或
+（同一列的多个取值）和按位与（不同列之间），不再对整个 DataFrame 反复执行
+``isin``；各个视图据此直接取出所需的行，无需先复制整张表。
+"""
+import numpy as np
+import pandas as pd
+
+FILTER_COLUMNS = ('年份', '行业名称', '省份')
+
+
+class FilterEngine:
+    """构建一次、只读使用的多列位图索引"""
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.n_rows = len(df)
+        self._values = {}
+        self._positions = {}
+        self._codes = {}
+        self._bitmaps = {}
+        for column in columns:
+            codes, uniques = pd.factorize(df[column], sort=True)
+            self._codes[column] = codes.astype(np.int32)
+            self._values[column] = list(uniques)
+            self._positions[column] = {value: i for i, value in enumerate(uniques)}
+            self._bitmaps[column] = np.vstack(
+                [np.packbits(codes == i) for i in range(len(uniques))]
+            ) if len(uniques) else np.zeros((0, (self.n_rows + 7) // 8), dtype=np.uint8)
+
+    def values(self, column):
+        """某一列所有取值（已排序），用作侧边栏选项"""
+        return list(self._values[column])
+
+    def codes(self, column):
+        """某一列每行的分类编码，与 values(column) 的下标对应"""
+        return self._codes[column]
+
+    def value_bitmap(self, column, selected):
+        """同一列多个取值的并集位图；选择中没有出现在数据里的取值会被忽略"""
+        positions = self._positions[column]
+        idx = [positions[value] for value in selected if value in positions]
+        if not idx:
+            return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        return np.bitwise_or.reduce(self._bitmaps[column][idx], axis=0)
+
+    def select(self, selections):
+        """按 {列名: 选中取值} 计算行位图；没有任何约束时返回 None（表示全部行）
+
+        取值为空（未选择）的列不参与筛选，与侧边栏“未选即全选”的语义一致。
+        """
+        bitmap = None
+        for column, selected in selections.items():
+            if not selected:
+                continue
+            column_bitmap = self.value_bitmap(column, selected)
+            bitmap = column_bitmap if bitmap is None else np.bitwise_and(bitmap, column_bitmap)
+        return bitmap
+
+    def rows(self, bitmap):
+        """位图对应的行号（升序）；bitmap 为 None 时返回 None"""
+        if bitmap is None:
+            return None
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_rows))
+
+    def take(self, df, bitmap):
+        """取出位图选中的行；不筛选时直接返回原表而不复制"""
+        if bitmap is None:
+            return df
+        return df.iloc[self.rows(bitmap)]
@@ -0,0 +1,185 @@
+"""一次页面运行内共享的筛选计划
+
+侧边栏的每个筛选条件（年份、行业、省份、企业名称、股票代码）都是一个谓词。
+分类列通过位图索引求值，企业名称通过 n-gram 倒排索引按字面子串匹配，
+股票代码通过排序数组做精确 / 前缀查找。
+``FilterPlan`` 按“列名 + 筛选值”缓存每个谓词的行位图，保证同一次运行中每个
+谓词只计算一次；各个页面区块只组合自己需要的谓词，并记录各自的耗时。
+没有企业名称、股票代码筛选时，分组均值和指数分布直接由预聚合立方体给出；
+指数变动榜由企业 × 年份面板给出，筛选条件只用来圈定参与排名的企业。
+"""
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from utils.cube import INDEX_COLUMN, index_histogram
+from utils.diagnostics import NULL_RECORDER
+
+# 通过位图索引求值的分类列，其余列通过各自的检索索引求值
+CATEGORY_COLUMNS = ('年份', '行业名称', '省份')
+TEXT_COLUMNS = ('企业名称', '股票代码')
+
+
+def describe_movers(movers, rows):
+    """在变动榜中补上企业名称、行业和省份（取自 rows 中以原始行号为索引的行）"""
+    details = rows.loc[movers.index, ['企业名称', '行业名称', '省份']]
+    return pd.concat([movers[['股票代码']], details, movers.drop(columns='股票代码')], axis=1)
+
+
+def parse_terms(text):
+    """把逗号分隔的输入拆成去掉首尾空白的关键词列表"""
+    if not text:
+        return []
+    return [term.strip() for term in text.split(',') if term.strip()]
+
+
+class FilterPlan:
+    """一次页面运行的筛选计划：谓词按值缓存，各区块按需组合"""
+
+    def __init__(self, dataset, state, recorder=None):
+        self.dataset = dataset
+        self.state = dict(state)
+        self.recorder = recorder or NULL_RECORDER
+        self.timings = {}
+        self.predicate_evaluations = Counter()
+        self._masks = {}
+
+    def mask(self, column, selected):
+        """单个谓词的行位图，未设置筛选时返回 None；结果按 (列名, 筛选值) 缓存"""
+        if not selected:
+            return None
+        key = (column, tuple(selected))
+        if key not in self._masks:
+            self.predicate_evaluations[column] += 1
+            with self.recorder.span(f'筛选:{column}') as span:
+                self._masks[key] = self._evaluate(column, selected)
+                if self.recorder.enabled:
+                    span.rows = int(np.count_nonzero(np.unpackbits(self._masks[key], count=len(self.dataset))))
+        return self._masks[key]
+
+    def _evaluate(self, column, selected):
+        filters = self.dataset.filters
+        if column in CATEGORY_COLUMNS:
+            return filters.value_bitmap(column, selected)
+        if column == '企业名称':
+            return np.packbits(self.dataset.names.mask(selected))
+        if column == '股票代码':
+            return np.packbits(self.dataset.codes.mask(selected))
+        raise KeyError(f'未知的筛选列: {column}')
+
+    def bitmap(self, columns, overrides=None):
+        """组合若干谓词的位图；overrides 可为某列替换筛选值（如地图只取单一年份）"""
+        overrides = overrides or {}
+        bitmap = None
+        for column in columns:
+            selected = overrides[column] if column in overrides else self.state.get(column)
+            column_mask = self.mask(column, selected)
+            if column_mask is None:
+                continue
+            bitmap = column_mask if bitmap is None else np.bitwise_and(bitmap, column_mask)
+        return bitmap
+
+    def count(self, columns, overrides=None):
+        """满足若干筛选条件的行数"""
+        bitmap = self.bitmap(columns, overrides)
+        if bitmap is None:
+            return len(self.dataset)
+        return int(np.count_nonzero(np.unpackbits(bitmap, count=len(self.dataset))))
+
+    def frame(self, section, columns, overrides=None):
+        """返回某个区块所需的行，并记录该区块取数的耗时"""
+        start = time.perf_counter()
+        bitmap = self.bitmap(columns, overrides)
+        result = self.dataset.filters.take(self.dataset.df, bitmap)
+        self.timings[section] = self.timings.get(section, 0.0) + time.perf_counter() - start
+        return result
+
+    def summary(self, section, columns, overrides=None):
+        """筛选结果的行数与指数的均值、最大值、最小值（忽略缺失值；没有数据时为 NaN），只读取指数一列"""
+        start = time.perf_counter()
+        rows = self.dataset.filters.rows(self.bitmap(columns, overrides))
+        values = self.dataset.df[INDEX_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)
+        if rows is not None:
+            values = values[rows]
+        valid = values[~np.isnan(values)]
+        result = {
+            'rows': len(values),
+            'mean': float(valid.mean()) if len(valid) else np.nan,
+            'max': float(valid.max()) if len(valid) else np.nan,
+            'min': float(valid.min()) if len(valid) else np.nan,
+        }
+        self.timings[section] = self.timings.get(section, 0.0) + time.perf_counter() - start
+        return result
+
+    def average(self, section, by, columns, overrides=None):
+        """某个区块按 by 分组的平均指数（按 by 排序）
+
+        所用谓词都是分类列时直接查询预聚合立方体，否则退回到筛选后的原始行上分组。
+        """
+        overrides = overrides or {}
+        selections = {
+            column: overrides[column] if column in overrides else self.state.get(column)
+            for column in columns
+        }
+        if any(selections[column] for column in columns if column in TEXT_COLUMNS):
+            rows = self.frame(section, columns, overrides)
+            start = time.perf_counter()
+            result = rows.groupby(by, observed=True)[INDEX_COLUMN].mean().reset_index()
+        else:
+            start = time.perf_counter()
+            result = self.dataset.cube.aggregate(by, selections)
+        self.timings[section] = self.timings.get(section, 0.0) + time.perf_counter() - start
+        return result
+
+    def histogram(self, section, columns):
+        """筛选结果中各整数分（0-100）的记录数，用于分布图"""
+        selections = {column: self.state.get(column) for column in columns}
+        if any(selections[column] for column in columns if column in TEXT_COLUMNS):
+            start = time.perf_counter()
+            rows = self.dataset.filters.rows(self.bitmap(columns))
+            values = self.dataset.df[INDEX_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)
+            result = index_histogram(values if rows is None else values[rows])
+        else:
+            start = time.perf_counter()
+            result = self.dataset.cube.histogram(selections)
+        self.timings[section] = self.timings.get(section, 0.0) + time.perf_counter() - start
+        return result
+
+    def ranking(self, section, columns, n, offset=0):
+        """按指数降序的第 offset+1 到 offset+n 名的行号，以及筛选后的总行数"""
+        start = time.perf_counter()
+        ranking = self.dataset.ranking
+        active = [column for column in columns if self.state.get(column)]
+        if active == ['年份']:
+            years = self.state['年份']
+            rows = ranking.top_in_years(years, n, offset)
+            total = ranking.year_total(years)
+        else:
+            selected = self.dataset.filters.rows(self.bitmap(columns))
+            rows = ranking.top(selected, n, offset)
+            total = len(self.dataset.df) if selected is None else len(selected)
+        self.timings[section] = self.timings.get(section, 0.0) + time.perf_counter() - start
+        return rows, total
+
+    def ranking_frame(self, section, columns, n, offset=0):
+        """排名第 offset+1 到 offset+n 名的行（保留原始行号作为索引），以及筛选后的总行数"""
+        rows, total = self.ranking(section, columns, n, offset)
+        return self.dataset.df.iloc[rows], total
+
+    def movers(self, section, year, metric, columns, n=10):
+        """某年指数变动最大的企业：(上升榜, 下降榜)，只考虑当年所在行满足筛选条件的企业"""
+        start = time.perf_counter()
+        bitmap = self.bitmap(columns)
+        row_mask = None if bitmap is None else np.unpackbits(bitmap, count=len(self.dataset)).astype(bool)
+        result = tuple(describe_movers(frame, self.dataset.df) for frame in self.dataset.panel.movers(year, metric, n, row_mask))
+        self.timings[section] = self.timings.get(section, 0.0) + time.perf_counter() - start
+        return result
+
+    def report(self):
+        """各区块耗时（毫秒）与各谓词的实际计算次数"""
+        return {
+            'sections_ms': {section: round(seconds * 1000, 3) for section, seconds in self.timings.items()},
+            'predicate_evaluations': dict(self.predicate_evaluations),
+        }
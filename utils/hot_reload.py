@@ -0,0 +1,219 @@
+"""数据文件的后台热更新
+
+发布新的合并工作簿后不必重启应用，也不会由第一个访问的用户承担解析 Excel 的时间：
+``DatasetWatcher`` 在后台线程中定期检查数据文件的修改时间和大小，发现新版本后
+
+1. 在子进程（``python -m utils.hot_reload``）中读取工作簿、计算派生列并写好缓存文件
+   （Parquet 缓存，SQL 后端时还有数据库文件）。解析 Excel 是整个过程中最慢的一步，
+   放在子进程中不会占用页面所在进程的 GIL；子进程失败时退回到在后台线程中处理；
+2. 在后台线程中从新的缓存打开数据集并构建全部查询结构；
+3. 一次引用赋值替换当前数据集。
+
+每次页面运行开始时取得当前数据集的引用，本次运行（以及之后只重新运行某个 fragment 时）
+一直使用这一版本，数据在一次运行中保持一致；下一次完整运行时才会看到新版本。旧版本在
+没有会话引用后被回收，替换前后一段时间内进程中会同时存在两份数据集。
+
+工作簿正在写入时大小或修改时间仍在变化，连续两次检查结果相同时才开始读取。读取或构建
+失败时继续使用当前版本，直到文件再次变化。检查间隔由环境变量 ``DT_INDEX_RELOAD_INTERVAL``
+（秒，默认 30）设置，设为 0 时关闭后台检查。
+"""
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime
+
+from utils.dataset import BACKENDS, load_frame, open_dataset
+
+RELOAD_INTERVAL_ENV = 'DT_INDEX_RELOAD_INTERVAL'
+DEFAULT_RELOAD_INTERVAL = 30
+# 子进程处理工作簿的超时时间（秒）
+BUILD_TIMEOUT = 3600
+LOGGER_NAME = 'dt_index.reload'
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def reload_interval(environ=None):
+    """后台检查的间隔（秒）；0 表示不检查"""
+    environ = os.environ if environ is None else environ
+    value = environ.get(RELOAD_INTERVAL_ENV)
+    try:
+        return max(float(value), 0.0) if value else float(DEFAULT_RELOAD_INTERVAL)
+    except ValueError:
+        logger.warning('%s 不是有效的秒数: %s，使用默认值 %s', RELOAD_INTERVAL_ENV, value, DEFAULT_RELOAD_INTERVAL)
+        return float(DEFAULT_RELOAD_INTERVAL)
+
+
+def file_signature(path):
+    """文件的 (修改时间, 大小)，文件不存在时返回 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def build_cache(path, backend):
+    """读取工作簿并写好缓存文件（不构建查询结构），缓存已是最新时什么也不做"""
+    if backend == 'pandas':
+        load_frame(path)
+        return
+    from utils.province import rules_fingerprint
+    from utils.sql_backend import build_database
+    build_database(path, backend, key=rules_fingerprint())
+
+
+def build_cache_in_subprocess(path, backend, timeout=BUILD_TIMEOUT):
+    """在子进程中执行 build_cache，成功时返回 True"""
+    command = [sys.executable, '-m', 'utils.hot_reload', backend, os.path.abspath(path)]
+    try:
+        completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning('子进程处理工作簿失败: %s', e)
+        return False
+    if completed.returncode != 0:
+        logger.warning('子进程处理工作簿失败: %s', completed.stderr.strip()[-500:])
+        return False
+    return True
+
+
+class DatasetWatcher:
+    """持有当前版本的数据集，并在后台检查数据文件、构建和替换新版本
+
+    每个版本发布时设置递增的 ``version`` 属性，可用作缓存键的一部分（id() 在旧版本被
+    回收后可能被新对象复用）。
+    """
+
+    def __init__(self, path, dataset, signature=None):
+        self.path = path
+        self.version = 1
+        dataset.version = self.version
+        self._dataset = dataset
+        self._signature = signature if signature is not None else file_signature(path)
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_check = None
+        self.last_reload = None
+        self.last_error = None
+
+    @classmethod
+    def open(cls, path, backend=None):
+        """加载数据集并开始持有；先记下文件状态，加载期间文件发生的变化会在下一次检查时发现
+
+        SQL 后端的每个版本都通过各自的数据库快照打开，重建数据库文件不影响仍在使用旧版本的会话。
+        """
+        signature = file_signature(path)
+        return cls(path, open_dataset(path, backend, snapshot=True), signature)
+
+    def current(self):
+        """当前版本的数据集"""
+        return self._dataset
+
+    def start(self, interval):
+        """启动后台检查线程；interval 为 0 时不启动"""
+        if not interval or self._thread is not None:
+            return
+        # 替换和失败的记录写到服务器日志
+        if not logger.handlers and not logging.getLogger().handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+            logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        self._thread = threading.Thread(target=_poll, args=(weakref.ref(self), interval, self._stop),
+                                        name='dt-index-reload', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def check(self):
+        """检查一次数据文件，发现稳定的新版本时构建并替换，返回是否替换了数据集"""
+        with self._lock:
+            self.last_check = datetime.now().isoformat(timespec='seconds')
+            signature = file_signature(self.path)
+            if signature is None or signature == self._signature:
+                self._pending = None
+                return False
+            if signature != self._pending:
+                # 第一次看到这个版本，文件可能仍在写入，下一次检查结果相同时再读取
+                self._pending = signature
+                return False
+            self._pending = None
+            return self._reload(signature)
+
+    def _reload(self, signature):
+        current = self._dataset
+        start = time.perf_counter()
+        try:
+            in_subprocess = build_cache_in_subprocess(self.path, current.backend)
+            dataset = open_dataset(self.path, current.backend, snapshot=True)
+        except Exception as e:
+            # 新版本有问题时继续使用当前版本，文件再次变化时重试
+            self._signature = signature
+            self.last_error = f'{type(e).__name__}: {e}'
+            logger.warning('数据文件 %s 已更新，但构建新版本失败，继续使用第 %d 版: %s',
+                           self.path, self.version, self.last_error)
+            return False
+        dataset.version = self.version + 1
+        self._dataset = dataset
+        self.version = dataset.version
+        self._signature = signature
+        self.last_error = None
+        self.last_reload = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'seconds': round(time.perf_counter() - start, 3),
+            'rows': len(dataset),
+            'cache_built_in': 'subprocess' if in_subprocess else 'thread',
+        }
+        logger.info('数据文件 %s 已更新，切换到第 %d 版（%d 条记录，耗时 %.1f 秒）',
+                    self.path, self.version, len(dataset), self.last_reload['seconds'])
+        return True
+
+    def status(self):
+        """当前版本与最近一次检查、替换和错误的信息"""
+        return {
+            'version': self.version,
+            'path': self.path,
+            'watching': self._thread is not None and self._thread.is_alive(),
+            'last_check': self.last_check,
+            'last_reload': self.last_reload,
+            'last_error': self.last_error,
+        }
+
+
+def _poll(watcher_ref, interval, stop):
+    """后台检查循环；只持有弱引用，watcher 被回收（如清除了 st.cache_resource）后自动退出"""
+    while not stop.wait(interval):
+        watcher = watcher_ref()
+        if watcher is None:
+            return
+        try:
+            watcher.check()
+        except Exception:
+            logger.exception('检查数据文件时出错')
+        del watcher
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2 or argv[0] not in BACKENDS:
+        print(f'用法: python -m utils.hot_reload {{{"|".join(BACKENDS)}}} 数据工作簿', file=sys.stderr)
+        return 2
+    try:
+        build_cache(argv[1], argv[0])
+    except Exception as e:
+        print(f'错误：无法处理数据文件 {argv[1]}: {e}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
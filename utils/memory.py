@@ -0,0 +1,90 @@
+"""看板数据的紧凑内存布局
+
+加载时把处理好的 DataFrame 换成更紧凑的列类型：
+
+- 取值重复较多的文本列（行业、省份、企业名称、股票代码）转为分类类型，每行只存一个
+  小整数编码，文本本身只保存一份；
+- 年份转为 int16，0-100 分指数转为 uint8，词频等计数列按取值范围缩小到最窄的整数类型。
+
+含缺失值或非整数的数值列保持原类型不变，数值结果与转换前完全一致。分组统计需要
+使用 ``observed=True``，只输出实际出现的分类。
+
+命令行查看各列转换前后的内存占用::
+
+    python -m utils.memory 合并后的数字化转型指数数据.xlsx
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 转为分类类型的文本列：不同取值个数不超过行数的这个比例时才转换
+CATEGORY_COLUMNS = ('股票代码', '企业名称', '行业代码', '行业名称', '省份')
+CATEGORY_MAX_RATIO = 0.5
+
+YEAR_COLUMN = '年份'
+INDEX_COLUMN = '数字化转型指数(0-100分)'
+COUNT_COLUMNS = ('总词频数',)
+
+
+def _is_whole(series):
+    """数值列是否不含缺失值且全部为整数"""
+    if series.isna().any():
+        return False
+    values = series.to_numpy()
+    return np.issubdtype(values.dtype, np.integer) or bool(np.all(np.mod(values, 1) == 0))
+
+
+def compact_frame(df):
+    """就地把各列转换为紧凑类型并返回 df"""
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            if df[column].nunique() <= CATEGORY_MAX_RATIO * len(df):
+                df[column] = df[column].astype('category')
+
+    if YEAR_COLUMN in df.columns and _is_whole(df[YEAR_COLUMN]):
+        df[YEAR_COLUMN] = df[YEAR_COLUMN].astype(np.int16)
+
+    if INDEX_COLUMN in df.columns and _is_whole(df[INDEX_COLUMN]):
+        values = df[INDEX_COLUMN]
+        if len(values) == 0 or (values.min() >= 0 and values.max() <= 255):
+            df[INDEX_COLUMN] = values.astype(np.uint8)
+
+    for column in COUNT_COLUMNS:
+        if column in df.columns and _is_whole(df[column]):
+            df[column] = pd.to_numeric(df[column].astype(np.int64),
+                                       downcast='unsigned' if (df[column] >= 0).all() else 'integer')
+    return df
+
+
+def memory_report(before, after):
+    """对比两个 DataFrame 各列的内存占用（字节），返回带合计行的报表"""
+    report = pd.DataFrame({
+        '转换前类型': before.dtypes.astype(str),
+        '转换前字节': before.memory_usage(deep=True, index=False),
+        '转换后类型': after.dtypes.astype(str),
+        '转换后字节': after.memory_usage(deep=True, index=False),
+    })
+    report.loc['合计'] = ['', report['转换前字节'].sum(), '', report['转换后字节'].sum()]
+    report['压缩比'] = (report['转换前字节'] / report['转换后字节']).round(1)
+    return report
+
+
+def main(argv=None):
+    from utils.dataset import prepare_frame
+
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else '合并后的数字化转型指数数据.xlsx'
+    try:
+        before = prepare_frame(pd.read_excel(path), compact=False)
+    except (OSError, ValueError, KeyError) as e:
+        print(f'错误：无法读取数据文件 {path}: {e}', file=sys.stderr)
+        return 1
+    after = compact_frame(before.copy())
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(memory_report(before, after))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""企业 × 年份的稠密面板
+
+加载数据时按规范化后的股票代码和年份把指数铺成一个稠密矩阵（每行一家企业、每列一个
+年份，年份连续，缺失为 NaN），并一次性算出：
+
+- 同比变化：相邻两列直接相减；
+- 当年行业内、省份内的百分位（0-100，越高越好，并列取平均名次，与
+  ``rank(pct=True)`` 一致）及其同比变化；
+
+所有量都是与指数矩阵同形的数组，“指数变动最大的企业”只需取出一列做部分排序，
+不必在整张表上反复 groupby。
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cube import INDEX_COLUMN
+
+UNKNOWN_CODE = '未知'
+
+# 变动榜可用的排序指标：显示名称 -> 面板属性
+MOVER_METRICS = {
+    '指数变化': 'yoy',
+    '行业内百分位变化': 'industry_pct_change',
+    '省份内百分位变化': 'province_pct_change',
+}
+
+# 变动榜的列：显示名称 -> 面板属性（取当年所在列）
+MOVER_COLUMNS = {
+    '本年指数': 'index',
+    '指数变化': 'yoy',
+    '行业内百分位': 'industry_pct',
+    '行业内百分位变化': 'industry_pct_change',
+    '省份内百分位': 'province_pct',
+    '省份内百分位变化': 'province_pct_change',
+}
+
+
+def _year_change(matrix):
+    """相邻年份之差，第一年为 NaN"""
+    change = np.full(matrix.shape, np.nan)
+    change[:, 1:] = matrix[:, 1:] - matrix[:, :-1]
+    return change
+
+
+def group_percentile(values, groups):
+    """按组计算升序百分位（0-100），并列取平均名次；值或组缺失（NaN / -1）时为 NaN"""
+    values = np.asarray(values, dtype=np.float64)
+    groups = np.asarray(groups, dtype=np.int64)
+    result = np.full(len(values), np.nan)
+    valid = np.flatnonzero(~np.isnan(values) & (groups >= 0))
+    if not len(valid):
+        return result
+    order = valid[np.lexsort((values[valid], groups[valid]))]
+    sorted_groups = groups[order]
+    sorted_values = values[order]
+
+    # 每个组在排序结果中的起点和大小
+    group_start = np.concatenate([[True], sorted_groups[1:] != sorted_groups[:-1]])
+    starts = np.flatnonzero(group_start)
+    sizes = np.diff(np.append(starts, len(order)))
+    position = np.arange(len(order)) - np.repeat(starts, sizes)
+
+    # 并列的一段取平均名次
+    tie_start = group_start | np.concatenate([[True], sorted_values[1:] != sorted_values[:-1]])
+    tie_ids = np.cumsum(tie_start) - 1
+    tie_first = position[tie_start]
+    tie_size = np.bincount(tie_ids)
+    average_rank = tie_first[tie_ids] + (tie_size[tie_ids] + 1) / 2
+
+    result[order] = average_rank / np.repeat(sizes, sizes) * 100
+    return result
+
+
+class FirmPanel:
+    """企业 × 年份的指数矩阵及由它派生的同比变化与组内百分位"""
+
+    def __init__(self, codes, years, values, industries, provinces, rows):
+        codes = pd.Series(np.asarray(codes, dtype=object))
+        years = np.asarray(years, dtype=np.int64)
+        rows = np.asarray(rows, dtype=np.int64)
+        known = (codes != UNKNOWN_CODE).to_numpy() & codes.notna().to_numpy()
+
+        firm_codes, self.firms = pd.factorize(codes[known], sort=True)
+        self.firms = pd.Index(self.firms, name='股票代码')
+        known_years = years[known]
+        self.years = np.arange(known_years.min(), known_years.max() + 1) if known.any() else np.empty(0, np.int64)
+        year_codes = known_years - (self.years[0] if len(self.years) else 0)
+        shape = (len(self.firms), len(self.years))
+
+        # 同一企业同一年有多行时取第一行
+        flat = firm_codes * shape[1] + year_codes
+        flat, first = np.unique(flat, return_index=True)
+        source = np.flatnonzero(known)[first]
+
+        self.row = np.full(shape, -1, dtype=np.int64)
+        self.row.flat[flat] = rows[source]
+        self.index = np.full(shape, np.nan)
+        self.index.flat[flat] = np.asarray(values, dtype=np.float64)[source]
+
+        self.industry_codes, self.industries = self._cell_codes(industries, source, flat, shape)
+        self.province_codes, self.provinces = self._cell_codes(provinces, source, flat, shape)
+
+        # 组键为 (年份, 组)，每年每个行业 / 省份单独排名
+        year_grid = np.broadcast_to(np.arange(shape[1]), shape)
+        self.industry_pct = self._percentile(self.industry_codes, len(self.industries), year_grid)
+        self.province_pct = self._percentile(self.province_codes, len(self.provinces), year_grid)
+
+        self.yoy = _year_change(self.index)
+        self.industry_pct_change = _year_change(self.industry_pct)
+        self.province_pct_change = _year_change(self.province_pct)
+
+    @staticmethod
+    def _cell_codes(labels, source, flat, shape):
+        codes, uniques = pd.factorize(pd.Series(np.asarray(labels, dtype=object)[source]), sort=True)
+        cells = np.full(shape, -1, dtype=np.int32)
+        cells.flat[flat] = codes
+        return cells, list(uniques)
+
+    def _percentile(self, group_codes, n_groups, year_grid):
+        groups = np.where(group_codes >= 0, year_grid * max(n_groups, 1) + group_codes, -1)
+        return group_percentile(self.index.ravel(), groups.ravel()).reshape(self.index.shape)
+
+    @classmethod
+    def from_frame(cls, df, rows=None):
+        """由处理后的数据构建；rows 为各行的原始行号，默认为行位置"""
+        return cls(
+            df['股票代码'].astype(object).to_numpy(),
+            df['年份'].to_numpy(),
+            df[INDEX_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan),
+            df['行业名称'].astype(object).to_numpy(),
+            df['省份'].astype(object).to_numpy(),
+            np.arange(len(df)) if rows is None else rows,
+        )
+
+    @property
+    def shape(self):
+        return self.index.shape
+
+    def year_position(self, year):
+        """年份所在的列，不在面板中时返回 None"""
+        if not len(self.years) or not self.years[0] <= year <= self.years[-1]:
+            return None
+        return int(year - self.years[0])
+
+    def firm_series(self, code, name):
+        """某家企业各年的某项指标（name 为面板属性名），以年份为索引"""
+        i = self.firms.get_loc(code)
+        return pd.Series(getattr(self, name)[i], index=self.years, name=code)
+
+    def movers(self, year, metric='指数变化', n=10, row_mask=None):
+        """某年按 metric 上升最多和下降最多的各 n 家企业
+
+        row_mask 为按原始行号的布尔数组，只考虑当年所在行被选中的企业（None 表示全部）。
+        返回 (上升榜, 下降榜)，以当年所在的原始行号为索引。
+        """
+        if metric not in MOVER_METRICS:
+            raise ValueError(f'不支持的排序指标: {metric}（可选: {", ".join(MOVER_METRICS)}）')
+        j = self.year_position(year)
+        if j is None:
+            empty = pd.DataFrame(columns=['股票代码', '上年指数', *MOVER_COLUMNS], index=pd.Index([], dtype=np.int64))
+            return empty, empty
+        values = getattr(self, MOVER_METRICS[metric])[:, j]
+        candidates = np.flatnonzero(~np.isnan(values))
+        if row_mask is not None:
+            candidates = candidates[row_mask[self.row[candidates, j]]]
+
+        # 按指标排序，相同时按股票代码
+        gainers = candidates[values[candidates] > 0]
+        gainers = gainers[np.lexsort((gainers, -values[gainers]))][:n]
+        decliners = candidates[values[candidates] < 0]
+        decliners = decliners[np.lexsort((decliners, values[decliners]))][:n]
+        return self._mover_frame(gainers, j), self._mover_frame(decliners, j)
+
+    def _mover_frame(self, firms, j):
+        columns = {'股票代码': self.firms[firms]}
+        columns['上年指数'] = self.index[firms, j - 1] if j > 0 else np.full(len(firms), np.nan)
+        for column, name in MOVER_COLUMNS.items():
+            columns[column] = getattr(self, name)[firms, j]
+        return pd.DataFrame(columns, index=pd.Index(self.row[firms, j]))
@@ -0,0 +1,125 @@
+"""从企业名称提取省份信息
+
+关键词表只在模块加载时编译一次：``ProvinceResolver`` 把所有关键词连同优先级
+放进一张哈希表，对每个名称只需扫描一遍其长度 1~4 的子串即可找到命中的关键词，
+再取优先级最高者。优先级与原先逐条扫描的规则一致：先特殊情况，再按省份字典
+顺序、各省关键词顺序。批量处理时只解析去重后的企业名称，再映射回每一行。
+"""
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+UNKNOWN_PROVINCE = '未知'
+
+# 省份和直辖市的关键词字典（顺序即匹配优先级）
+PROVINCE_KEYWORDS = {
+    '北京': ['北京', '京'],
+    '上海': ['上海', '沪', '浦发'],
+    '广东': ['广东', '粤', '深圳', '广州', '东莞', '佛山', '珠海'],
+    '江苏': ['江苏', '苏', '南京', '苏州', '无锡', '常州'],
+    '浙江': ['浙江', '浙', '杭州', '宁波', '温州', '绍兴'],
+    '山东': ['山东', '鲁', '青岛', '济南', '烟台', '淄博'],
+    '河北': ['河北', '冀', '石家庄', '唐山', '邯郸'],
+    '河南': ['河南', '豫', '郑州', '洛阳'],
+    '湖北': ['湖北', '鄂', '武汉', '黄石', '十堰'],
+    '湖南': ['湖南', '湘', '长沙', '株洲', '湘潭'],
+    '四川': ['四川', '川', '蜀', '成都', '绵阳'],
+    '陕西': ['陕西', '陕', '秦', '西安', '宝鸡'],
+    '安徽': ['安徽', '皖', '合肥', '芜湖'],
+    '福建': ['福建', '闽', '福州', '厦门'],
+    '江西': ['江西', '赣', '南昌', '九江'],
+    '广西': ['广西', '桂', '南宁', '柳州'],
+    '云南': ['云南', '滇', '昆明'],
+    '贵州': ['贵州', '黔', '贵阳'],
+    '辽宁': ['辽宁', '辽', '沈阳', '大连'],
+    '吉林': ['吉林', '吉', '长春'],
+    '黑龙江': ['黑龙江', '黑', '哈尔滨'],
+    '天津': ['天津', '津'],
+    '重庆': ['重庆', '渝'],
+    '山西': ['山西', '晋', '太原'],
+    '内蒙古': ['内蒙古', '蒙', '呼和浩特'],
+    '西藏': ['西藏', '藏', '拉萨'],
+    '新疆': ['新疆', '疆', '乌鲁木齐'],
+    '青海': ['青海', '青', '西宁'],
+    '甘肃': ['甘肃', '甘', '陇', '兰州'],
+    '宁夏': ['宁夏', '宁', '银川'],
+    '海南': ['海南', '琼', '海口', '三亚']
+}
+
+# 特殊处理（优先于省份关键词）
+SPECIAL_CASES = {
+    '东北': '辽宁',  # 东北高速 -> 辽宁
+    '西南': '四川',
+    '华北': '北京',
+    '华东': '上海',
+    '华南': '广东',
+    '华中': '湖北'
+}
+
+
+def rules_fingerprint(provinces=PROVINCE_KEYWORDS, special_cases=SPECIAL_CASES):
+    """关键词规则的摘要，规则修改后数据缓存据此自动失效"""
+    payload = json.dumps([special_cases, provinces], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class ProvinceResolver:
+    """编译一次关键词表、可重复使用的省份解析器"""
+
+    def __init__(self, provinces=PROVINCE_KEYWORDS, special_cases=SPECIAL_CASES):
+        # 关键词 -> (优先级, 省份)，同一关键词出现多次时保留最先出现的
+        table = {}
+        entries = list(special_cases.items()) + [
+            (keyword, province)
+            for province, keywords in provinces.items()
+            for keyword in keywords
+        ]
+        for rank, (keyword, province) in enumerate(entries):
+            table.setdefault(keyword, (rank, province))
+        self._table = table
+        self._lengths = sorted({len(keyword) for keyword in table})
+        self._memo = {}
+
+    def resolve(self, company_name):
+        """解析单个企业名称，结果按名称缓存"""
+        if not isinstance(company_name, str) or not company_name:
+            return UNKNOWN_PROVINCE
+        province = self._memo.get(company_name)
+        if province is None:
+            province = self._memo[company_name] = self._match(company_name)
+        return province
+
+    def _match(self, name):
+        best = None
+        table = self._table
+        for length in self._lengths:
+            for start in range(len(name) - length + 1):
+                hit = table.get(name[start:start + length])
+                if hit is not None and (best is None or hit[0] < best[0]):
+                    best = hit
+        return best[1] if best is not None else UNKNOWN_PROVINCE
+
+    def resolve_series(self, names):
+        """批量解析：只处理去重后的名称，再按位置映射回每一行"""
+        codes, uniques = pd.factorize(names)
+        resolved = np.array(
+            [self.resolve(name) for name in uniques] + [UNKNOWN_PROVINCE],
+            dtype=object
+        )
+        # factorize 把缺失值编码为 -1，正好取到末尾的“未知”
+        return pd.Series(resolved[codes], index=names.index, name='省份')
+
+
+_default_resolver = ProvinceResolver()
+
+
+def extract_province(company_name):
+    """从企业名称中提取省份信息"""
+    return _default_resolver.resolve(company_name)
+
+
+def resolve_provinces(names):
+    """为一列企业名称批量提取省份信息"""
+    return _default_resolver.resolve_series(names)
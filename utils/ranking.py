@@ -0,0 +1,64 @@
+"""企业排名的 Top-N 查询
+
+加载数据时把所有行按指数降序做一次稳定排序（并列时保持原始行序，缺失值排在
+最后），记录每行的全局名次，并按年份保存各年已排好序的行号。查询时不再对
+筛选结果整体排序：只按年份筛选时直接合并各年排好序的前 k 行；其他筛选则在
+选中行的名次上做部分选择（argpartition），只对前 k 行排序。
+"""
+import numpy as np
+
+from utils.cube import INDEX_COLUMN
+
+
+class RankingIndex:
+    """按指数降序的预排序行号与逐年排序结果"""
+
+    def __init__(self, df, filters, value_column=INDEX_COLUMN):
+        values = df[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+        # 降序且稳定；缺失值视为最小，排在最后
+        key = np.where(np.isnan(values), np.inf, -values)
+        self.order = np.argsort(key, kind='stable')
+        self.rank = np.empty(len(values), dtype=np.int64)
+        self.rank[self.order] = np.arange(len(values))
+
+        # 各年份的行号按名次排列，存成 CSR 形式：year_order[offsets[i]:offsets[i+1]]
+        self._years = filters.values('年份')
+        self._year_positions = {year: i for i, year in enumerate(self._years)}
+        year_codes = filters.codes('年份')[self.order]
+        by_year = np.argsort(year_codes, kind='stable')
+        self.year_order = self.order[by_year]
+        counts = np.bincount(year_codes[year_codes >= 0], minlength=len(self._years))
+        skipped = np.count_nonzero(year_codes < 0)
+        self.year_offsets = skipped + np.concatenate([[0], np.cumsum(counts)])
+
+    def _year_slice(self, year):
+        i = self._year_positions[year]
+        return self.year_order[self.year_offsets[i]:self.year_offsets[i + 1]]
+
+    def year_total(self, years):
+        """若干年份的总行数"""
+        return sum(len(self._year_slice(year)) for year in years if year in self._year_positions)
+
+    def top_in_years(self, years, n, offset=0):
+        """只按年份筛选时的第 offset+1 到 offset+n 名：合并各年预排序结果的前缀"""
+        k = offset + n
+        heads = [self._year_slice(year)[:k] for year in years if year in self._year_positions]
+        if not heads:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.concatenate(heads)
+        candidates = candidates[np.argsort(self.rank[candidates])]
+        return candidates[offset:k]
+
+    def top(self, rows, n, offset=0):
+        """任意行子集的第 offset+1 到 offset+n 名；rows 为 None 表示全部行"""
+        k = offset + n
+        if rows is None:
+            return self.order[offset:k]
+        ranks = self.rank[rows]
+        if k < len(rows):
+            # 名次各不相同，部分选择出的前 k 个就是排序后的前 k 个
+            head = np.argpartition(ranks, k - 1)[:k]
+        else:
+            head = np.arange(len(rows))
+        head = head[np.argsort(ranks[head])]
+        return rows[head][offset:k]
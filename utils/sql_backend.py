@@ -0,0 +1,454 @@
+"""嵌入式 SQL 查询后端（SQLite / DuckDB）
+
+默认的 pandas 后端把整张表和各个查询结构都放在内存中。数据量超出容器内存时，
+可以通过环境变量 ``DT_INDEX_BACKEND`` 选择 ``sqlite`` 或 ``duckdb``：首次加载时把
+处理好的数据写入工作簿旁的数据库文件（与 Parquet 缓存相同的失效规则），之后侧边栏
+筛选、年度趋势、行业与省份对比、地图和企业排名都在数据库中以 SQL 执行，进程内
+只保留查询结果。
+
+查询结果与 pandas 后端完全一致：
+
+- 分组均值由 SQL 返回的合计与计数在 Python 中相除，与预聚合立方体的算法相同；
+- 分组结果按取值排序（两种数据库默认按码位比较字符串，与 pandas 的排序一致）；
+- 排名按指数降序、并列时按原始行序（``_row`` 列），等同于稳定排序；
+- 企业名称在预先用 Python 转为小写的名称上做字面子串匹配，股票代码按前缀匹配；
+- 指数变动榜使用同一个企业 × 年份面板（加载时只读取构建面板所需的几列），数据库只负责圈定参与排名的行。
+
+部署前可先在命令行建好数据库文件::
+
+    python -m utils.sql_backend duckdb 合并后的数字化转型指数数据.xlsx
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from itertools import count
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.cube import INDEX_COLUMN, index_histogram
+from utils.data_cache import cache_path_for, file_sha256, is_cache_valid, source_metadata
+from utils.diagnostics import NULL_RECORDER
+from utils.filter_engine import FILTER_COLUMNS
+from utils.filter_plan import CATEGORY_COLUMNS, describe_movers
+from utils.panel import FirmPanel
+from utils.stock_code import normalize_query_code
+
+# 后端名称 -> 数据库文件的后缀
+SQL_BACKENDS = {'sqlite': '.sqlite', 'duckdb': '.duckdb'}
+# 数据集专用的数据库快照：<数据库文件>.<进程号>-<序号>.snapshot
+SNAPSHOT_SUFFIX = '.snapshot'
+_snapshot_ids = count(1)
+
+TABLE = 'panel'
+META_TABLE = 'dt_index_meta'
+ROW_COLUMN = '_row'
+NAME_KEY_COLUMN = '_name_lower'
+# SQLite 上建立索引的列（DuckDB 依靠列存的区间统计，不需要索引）
+INDEXED_COLUMNS = ('年份', '行业名称', '省份', '股票代码')
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _param(value):
+    """把 NumPy 标量转换为数据库驱动能绑定的 Python 值"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def connect(backend, path, read_only=True):
+    """打开数据库连接；SQLite 以只读 URI 打开，可在 Streamlit 的多个线程间使用"""
+    if backend == 'sqlite':
+        import sqlite3
+        if read_only:
+            uri = Path(os.path.abspath(path)).as_uri() + '?mode=ro'
+            return sqlite3.connect(uri, uri=True, check_same_thread=False)
+        return sqlite3.connect(path)
+    if backend == 'duckdb':
+        import duckdb
+        return duckdb.connect(path, read_only=read_only)
+    raise ValueError(f'不支持的查询后端: {backend}（可选: {", ".join(SQL_BACKENDS)}）')
+
+
+def fetch_frame(connection, sql, params=()):
+    """执行查询并返回 DataFrame（两种数据库共用 DB-API 接口）"""
+    cursor = connection.execute(sql, [_param(value) for value in params])
+    columns = [description[0] for description in cursor.description]
+    return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+
+def read_database_metadata(backend, path):
+    """读取数据库中记录的源文件信息，数据库不存在或损坏时返回 None"""
+    if not os.path.exists(path):
+        return None
+    try:
+        connection = connect(backend, path)
+        try:
+            row = connection.execute(f'SELECT value FROM {META_TABLE}').fetchone()
+        finally:
+            connection.close()
+        return json.loads(row[0]) if row else None
+    except Exception:
+        return None
+
+
+def _table_frame(df):
+    """写入数据库的表：分类列还原为文本，并加上原始行号和小写企业名称"""
+    table = pd.DataFrame({
+        column: df[column].astype(object) if isinstance(df[column].dtype, pd.CategoricalDtype) else df[column]
+        for column in df.columns
+    })
+    table[ROW_COLUMN] = np.arange(len(table), dtype=np.int64)
+    # 与 NgramIndex 相同：用 Python 的 str.lower() 转换，保证大小写规则一致
+    codes, uniques = pd.factorize(df['企业名称'])
+    lowered = np.array([str(name).lower() for name in uniques] + [None], dtype=object)
+    table[NAME_KEY_COLUMN] = lowered[codes]
+    return table
+
+
+def write_database(df, backend, path, meta):
+    """把处理好的数据写入新的数据库文件（先写临时文件再原子替换）"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(suffix=SQL_BACKENDS[backend] + '.tmp', dir=directory)
+    os.close(fd)
+    os.remove(tmp_path)  # DuckDB 不接受已存在的空文件
+    try:
+        connection = connect(backend, tmp_path, read_only=False)
+        try:
+            table = _table_frame(df)
+            if backend == 'sqlite':
+                table.to_sql(TABLE, connection, index=False)
+                for column in INDEXED_COLUMNS:
+                    connection.execute(f'CREATE INDEX idx_{INDEXED_COLUMNS.index(column)} ON {TABLE} ({_quote(column)})')
+            else:
+                connection.register('source_frame', table)
+                connection.execute(f'CREATE TABLE {TABLE} AS SELECT * FROM source_frame')
+                connection.unregister('source_frame')
+            connection.execute(f'CREATE TABLE {META_TABLE} (value TEXT)')
+            connection.execute(f'INSERT INTO {META_TABLE} VALUES (?)', [json.dumps(meta)])
+            connection.commit()
+        finally:
+            connection.close()
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def build_database(source_path, backend, key=''):
+    """确保工作簿对应的数据库文件存在且未过期，返回其路径"""
+    from utils.dataset import load_frame
+
+    if backend not in SQL_BACKENDS:
+        raise ValueError(f'不支持的查询后端: {backend}（可选: {", ".join(SQL_BACKENDS)}）')
+    path = cache_path_for(source_path, SQL_BACKENDS[backend])
+    stat = os.stat(source_path)
+    if is_cache_valid(read_database_metadata(backend, path), source_path, stat, key):
+        return path
+    df = load_frame(source_path)
+    write_database(df, backend, path, source_metadata(source_path, stat, key, file_sha256(source_path)))
+    return path
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def link_snapshot(path):
+    """为数据库文件建立本进程专用的快照（硬链接，不支持时复制），返回快照路径
+
+    SQLite 每次页面运行都按路径新开连接，DuckDB 在进程内按路径复用已打开的数据库，
+    数据库文件被替换后，直接按原路径打开的数据集会读到新文件或拿到旧的实例。每个数据集
+    通过自己的快照打开即可各自保持一致。顺带删除已退出的进程遗留的快照。
+    """
+    directory, filename = os.path.split(os.path.abspath(path))
+    prefix = f'{filename}.'
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(SNAPSHOT_SUFFIX):
+            pid = name[len(prefix):-len(SNAPSHOT_SUFFIX)].split('-')[0]
+            if pid.isdigit() and not _process_alive(int(pid)):
+                _remove_file(os.path.join(directory, name))
+    snapshot = f'{os.path.abspath(path)}.{os.getpid()}-{next(_snapshot_ids)}{SNAPSHOT_SUFFIX}'
+    try:
+        os.link(path, snapshot)
+    except OSError:
+        shutil.copyfile(path, snapshot)
+    return snapshot
+
+
+class SqlDataset:
+    """数据库中的处理后数据，提供与 IndexDataset 相同的页面接口"""
+
+    def __init__(self, backend, path):
+        self.backend = backend
+        self.path = path
+        self._connection = connect(backend, path)
+        self._local = threading.local()
+        header = self._connection.execute(f'SELECT * FROM {TABLE} LIMIT 0').description
+        self.columns = [d[0] for d in header if d[0] not in (ROW_COLUMN, NAME_KEY_COLUMN)]
+        self._values = {}
+        for column in FILTER_COLUMNS:
+            rows = self._connection.execute(
+                f'SELECT DISTINCT {_quote(column)} FROM {TABLE} '
+                f'WHERE {_quote(column)} IS NOT NULL ORDER BY {_quote(column)}'
+            ).fetchall()
+            self._values[column] = [row[0] for row in rows]
+        self._n_rows = self._connection.execute(f'SELECT COUNT(*) FROM {TABLE}').fetchone()[0]
+        panel_columns = ', '.join(_quote(column) for column in (ROW_COLUMN, '股票代码', '年份', INDEX_COLUMN, '行业名称', '省份'))
+        panel_rows = fetch_frame(self._connection, f'SELECT {panel_columns} FROM {TABLE} ORDER BY {ROW_COLUMN}')
+        self.panel = FirmPanel.from_frame(panel_rows, rows=panel_rows[ROW_COLUMN].to_numpy())
+
+    @classmethod
+    def from_path(cls, source_path, backend, key='', snapshot=False):
+        """snapshot 为 True 时通过数据库文件的快照打开，之后重建数据库文件（如数据热更新）不影响本数据集"""
+        path = build_database(source_path, backend, key)
+        if not snapshot:
+            return cls(backend, path)
+        link = link_snapshot(path)
+        try:
+            dataset = cls(backend, link)
+        except Exception:
+            _remove_file(link)
+            raise
+        # 数据集被回收（没有会话再使用）时删除快照
+        weakref.finalize(dataset, _remove_file, link)
+        return dataset
+
+    def cursor(self):
+        """当前线程的连接：SQLite 为只读连接，DuckDB 为从共享连接派生的游标
+
+        每个线程只打开一次，之后的页面运行复用；线程结束或数据集被回收时随之关闭，
+        不会每次运行都留下一个打开的数据库文件。
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if self.backend == 'sqlite':
+                connection = connect(self.backend, self.path)
+            else:
+                connection = self._connection.cursor()
+            self._local.connection = connection
+        return connection
+
+    def values(self, column):
+        """某一筛选列所有取值（已排序），用作侧边栏选项"""
+        return list(self._values[column])
+
+    def plan(self, state, recorder=None):
+        return SqlFilterPlan(self, state, recorder)
+
+    def __len__(self):
+        return self._n_rows
+
+
+class SqlFilterPlan:
+    """一次页面运行的筛选计划（SQL 版），接口与 FilterPlan 相同"""
+
+    def __init__(self, dataset, state, recorder=None):
+        self.dataset = dataset
+        self.state = dict(state)
+        self.recorder = recorder or NULL_RECORDER
+        self.timings = {}
+        self.predicate_evaluations = Counter()
+        self._predicates = {}
+
+    def _query(self, sql, params=()):
+        # 不在计划中保存连接：fragment 重新运行时可能在另一个线程中使用同一个计划
+        with self.recorder.span('SQL查询') as span:
+            result = fetch_frame(self.dataset.cursor(), sql, params)
+            span.rows = len(result)
+        return result
+
+    def predicate(self, column, selected):
+        """单个筛选条件的 SQL 片段和参数，未设置筛选时返回 None；结果按 (列名, 筛选值) 缓存"""
+        if not selected:
+            return None
+        key = (column, tuple(selected))
+        if key not in self._predicates:
+            self.predicate_evaluations[column] += 1
+            self._predicates[key] = self._compile(column, selected)
+        return self._predicates[key]
+
+    def _compile(self, column, selected):
+        if column in CATEGORY_COLUMNS:
+            placeholders = ', '.join('?' * len(selected))
+            return f'{_quote(column)} IN ({placeholders})', list(selected)
+        if column == '企业名称':
+            terms = [term.lower() for term in selected if term.lower()]
+            clauses = [f'instr({NAME_KEY_COLUMN}, ?) > 0' for _ in terms]
+            return (f'({" OR ".join(clauses)})' if clauses else '1 = 0'), terms
+        if column == '股票代码':
+            terms = [normalize_query_code(term) for term in selected if term.strip()]
+            clauses = [f'substr({_quote(column)}, 1, ?) = ?' for _ in terms]
+            params = [value for term in terms for value in (len(term), term)]
+            return (f'({" OR ".join(clauses)})' if clauses else '1 = 0'), params
+        raise KeyError(f'未知的筛选列: {column}')
+
+    def where(self, columns, overrides=None, extra=()):
+        """组合若干筛选条件的 WHERE 子句；overrides 可为某列替换筛选值"""
+        overrides = overrides or {}
+        clauses, params = list(extra), []
+        for column in columns:
+            selected = overrides[column] if column in overrides else self.state.get(column)
+            predicate = self.predicate(column, selected)
+            if predicate is None:
+                continue
+            clauses.append(predicate[0])
+            params.extend(predicate[1])
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+    def _record(self, section, start):
+        self.timings[section] = self.timings.get(section, 0.0) + time.perf_counter() - start
+
+    def _rows_frame(self, result):
+        """以原始行号为索引，与 pandas 后端取出的行保持一致"""
+        result = result.set_index(ROW_COLUMN)
+        result.index.name = None
+        return result
+
+    def count(self, columns, overrides=None):
+        """满足若干筛选条件的行数"""
+        where, params = self.where(columns, overrides)
+        return int(self._query(f'SELECT COUNT(*) AS n FROM {TABLE}{where}', params)['n'].iloc[0])
+
+    def frame(self, section, columns, overrides=None):
+        """返回某个区块所需的行（按原始行序），并记录该区块取数的耗时"""
+        start = time.perf_counter()
+        where, params = self.where(columns, overrides)
+        select = ', '.join(_quote(column) for column in self.dataset.columns + [ROW_COLUMN])
+        result = self._rows_frame(self._query(f'SELECT {select} FROM {TABLE}{where} ORDER BY {ROW_COLUMN}', params))
+        self._record(section, start)
+        return result
+
+    def summary(self, section, columns, overrides=None):
+        """筛选结果的行数与指数的均值、最大值、最小值（忽略缺失值；没有数据时为 NaN），一次聚合查询"""
+        start = time.perf_counter()
+        where, params = self.where(columns, overrides)
+        index = _quote(INDEX_COLUMN)
+        row = self._query(
+            f'SELECT COUNT(*) AS n, AVG({index}) AS mean, MAX({index}) AS max, MIN({index}) AS min FROM {TABLE}{where}',
+            params,
+        ).iloc[0]
+        result = {'rows': int(row['n'])}
+        for key in ('mean', 'max', 'min'):
+            result[key] = np.nan if pd.isna(row[key]) else float(row[key])
+        self._record(section, start)
+        return result
+
+    def _valid_rows(self):
+        """与预聚合立方体一致：忽略指数缺失或任一筛选维度缺失的行"""
+        return [f'{_quote(INDEX_COLUMN)} IS NOT NULL'] + [f'{_quote(dim)} IS NOT NULL' for dim in FILTER_COLUMNS]
+
+    def average(self, section, by, columns, overrides=None):
+        """某个区块按 by 分组的平均指数（按 by 排序）"""
+        start = time.perf_counter()
+        where, params = self.where(columns, overrides, extra=self._valid_rows())
+        sums = self._query(
+            f'SELECT {_quote(by)} AS key, SUM({_quote(INDEX_COLUMN)}) AS total, COUNT(*) AS n '
+            f'FROM {TABLE}{where} GROUP BY {_quote(by)} ORDER BY {_quote(by)}',
+            params,
+        )
+        keys = pd.Index(self.dataset.values(by))
+        total = sums['total'].to_numpy(dtype=np.float64)
+        count = sums['n'].to_numpy(dtype=np.float64)
+        result = pd.DataFrame({INDEX_COLUMN: total / count})
+        result.insert(0, by, keys[keys.get_indexer(sums['key'])])
+        self._record(section, start)
+        return result
+
+    def histogram(self, section, columns):
+        """筛选结果中各整数分（0-100）的记录数，用于分布图"""
+        start = time.perf_counter()
+        where, params = self.where(columns, extra=self._valid_rows())
+        counts = self._query(
+            f'SELECT {_quote(INDEX_COLUMN)} AS value, COUNT(*) AS n FROM {TABLE}{where} GROUP BY {_quote(INDEX_COLUMN)}',
+            params,
+        )
+        result = index_histogram(counts['value'].to_numpy(dtype=np.float64), weights=counts['n'].to_numpy())
+        self._record(section, start)
+        return result
+
+    def ranking_frame(self, section, columns, n, offset=0):
+        """按指数降序的第 offset+1 到 offset+n 名的行，以及筛选后的总行数"""
+        start = time.perf_counter()
+        where, params = self.where(columns)
+        select = ', '.join(_quote(column) for column in self.dataset.columns + [ROW_COLUMN])
+        index = _quote(INDEX_COLUMN)
+        rows = self._rows_frame(self._query(
+            f'SELECT {select} FROM {TABLE}{where} '
+            f'ORDER BY {index} IS NULL, {index} DESC, {ROW_COLUMN} LIMIT ? OFFSET ?',
+            params + [int(n), int(offset)],
+        ))
+        total = self._query(f'SELECT COUNT(*) AS n FROM {TABLE}{where}', params)['n'].iloc[0]
+        self._record(section, start)
+        return rows, int(total)
+
+    def movers(self, section, year, metric, columns, n=10):
+        """某年指数变动最大的企业：(上升榜, 下降榜)，只考虑当年所在行满足筛选条件的企业"""
+        start = time.perf_counter()
+        where, params = self.where(columns)
+        row_mask = None
+        if where:
+            selected = self._query(f'SELECT {ROW_COLUMN} FROM {TABLE}{where}', params)[ROW_COLUMN].to_numpy(dtype=np.int64)
+            row_mask = np.zeros(len(self.dataset), dtype=bool)
+            row_mask[selected] = True
+        result = []
+        for frame in self.dataset.panel.movers(year, metric, n, row_mask):
+            rows = [int(row) for row in frame.index]
+            placeholders = ', '.join('?' * len(rows)) or 'NULL'
+            select = ', '.join(_quote(column) for column in (ROW_COLUMN, '企业名称', '行业名称', '省份'))
+            details = self._rows_frame(self._query(
+                f'SELECT {select} FROM {TABLE} WHERE {ROW_COLUMN} IN ({placeholders})', rows,
+            ))
+            result.append(describe_movers(frame, details))
+        self._record(section, start)
+        return tuple(result)
+
+    def report(self):
+        """各区块耗时（毫秒）与各筛选条件的实际编译次数"""
+        return {
+            'sections_ms': {section: round(seconds * 1000, 3) for section, seconds in self.timings.items()},
+            'predicate_evaluations': dict(self.predicate_evaluations),
+        }
+
+
+def main(argv=None):
+    from utils.province import rules_fingerprint
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in SQL_BACKENDS:
+        print(f'用法: python -m utils.sql_backend {{{"|".join(SQL_BACKENDS)}}} [数据工作簿]', file=sys.stderr)
+        return 2
+    source_path = argv[1] if len(argv) > 1 else '合并后的数字化转型指数数据.xlsx'
+    try:
+        path = build_database(source_path, argv[0], key=rules_fingerprint())
+    except (OSError, ValueError, ImportError) as e:
+        print(f'错误：无法建立数据库: {e}', file=sys.stderr)
+        return 1
+    print(f'数据库已就绪: {path}（{len(SqlDataset(argv[0], path))} 条记录）')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
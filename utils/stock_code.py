@@ -0,0 +1,69 @@
+"""股票代码的规范化与检索
+
+``normalize_stock_codes`` 以向量化方式把股票代码统一成 6 位字符串：Excel 把代码
+读成整数或浮点数时会丢掉前导零（如 000001 变成 1），这里统一补齐。指数计算脚本
+和分析平台共用这一实现。
+
+``StockCodeIndex`` 保存排好序的代码数组，用 ``searchsorted`` 做精确和前缀查找，
+粘贴几百个代码时也只需几次二分查找，不必拼接巨大的正则表达式。
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+_EXCHANGE_MARKS = re.compile(r'^(SH|SZ|BJ)|\.(SH|SZ|BJ)$')
+_PREFIX_END = chr(0x10FFFF)
+
+
+def normalize_stock_codes(codes):
+    """把一列股票代码统一成 6 位字符串；缺失值保持缺失，非数字代码（如“未知”）保持不变"""
+    codes = pd.Series(codes)
+    if pd.api.types.is_float_dtype(codes):
+        # 含缺失值的整数列会被读成浮点数，先转回可空整数避免出现 “1.0”
+        codes = codes.astype('Int64')
+    text = codes.astype('string').str.strip()
+    text = text.str.replace(r'\.0+$', '', regex=True)
+    short_digits = text.str.fullmatch(r'\d{1,5}').fillna(False).astype(bool)
+    text = text.mask(short_digits, text.str.zfill(6))
+    return text.astype(object).where(text.notna(), np.nan)
+
+
+def normalize_query_code(term):
+    """规范化用户输入的单个代码：去掉空白和交易所标记（如 SZ000001、600000.SH）"""
+    return _EXCHANGE_MARKS.sub('', term.strip().upper())
+
+
+class StockCodeIndex:
+    """排好序的股票代码数组，支持批量精确 / 前缀查找"""
+
+    def __init__(self, codes):
+        values = pd.Series(codes).fillna('').astype(str).to_numpy(dtype=str)
+        self.n_rows = len(values)
+        self.order = np.argsort(values, kind='stable')
+        self.sorted_codes = values[self.order]
+
+    def _ranges(self, terms, prefix):
+        terms = np.array([normalize_query_code(term) for term in terms if term.strip()], dtype=str)
+        if not len(terms):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        lo = np.searchsorted(self.sorted_codes, terms, side='left')
+        if prefix:
+            hi = np.searchsorted(self.sorted_codes, np.char.add(terms, _PREFIX_END), side='left')
+        else:
+            hi = np.searchsorted(self.sorted_codes, terms, side='right')
+        return lo, hi
+
+    def rows(self, terms, prefix=True):
+        """代码等于（prefix=False）或以（prefix=True）任一输入开头的行号（升序）"""
+        lo, hi = self._ranges(terms, prefix)
+        hits = [self.order[start:stop] for start, stop in zip(lo, hi) if stop > start]
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(hits))
+
+    def mask(self, terms, prefix=True):
+        """每行的股票代码是否命中任一输入（布尔数组）"""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.rows(terms, prefix)] = True
+        return mask
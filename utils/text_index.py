@@ -0,0 +1,71 @@
+"""企业名称的字符 n-gram 倒排索引
+
+加载数据时对去重后的企业名称建立单字与二元组（bigram）倒排表。查询时把每个
+关键词拆成二元组，取各倒排表的交集作为候选，再逐个核对是否真的包含该关键词；
+多个关键词之间取并集。关键词按字面匹配（不区分大小写），名称中的括号等
+正则元字符不再影响搜索。结果映射回行号，可直接接入现有的筛选流程。
+"""
+import numpy as np
+import pandas as pd
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NgramIndex:
+    """去重名称上的单字 + 二元组倒排索引"""
+
+    def __init__(self, names):
+        codes, uniques = pd.factorize(names)
+        self.n_rows = len(codes)
+        self._codes = codes
+        self._names = [str(name).lower() for name in uniques]
+        postings = {}
+        for name_id, name in enumerate(self._names):
+            for gram in _grams(name, 1) | _grams(name, 2):
+                postings.setdefault(gram, []).append(name_id)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def _candidates(self, term):
+        n = 1 if len(term) == 1 else 2
+        lists = []
+        for gram in _grams(term, n):
+            posting = self._postings.get(gram)
+            if posting is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(posting)
+        # 从最短的倒排表开始求交集
+        lists.sort(key=len)
+        candidates = lists[0]
+        for posting in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        return candidates
+
+    def match_names(self, terms):
+        """包含任一关键词的名称编号"""
+        matched = set()
+        for term in terms:
+            term = term.lower()
+            if not term:
+                continue
+            candidates = self._candidates(term)
+            if len(term) <= 2:
+                # 单字和二元组的倒排表本身就是精确结果
+                matched.update(candidates.tolist())
+            else:
+                matched.update(i for i in candidates.tolist() if term in self._names[i])
+        return np.fromiter(matched, dtype=np.int64, count=len(matched))
+
+    def mask(self, terms):
+        """每行的企业名称是否包含任一关键词（布尔数组）"""
+        hit = np.zeros(len(self._names) + 1, dtype=bool)
+        hit[self.match_names(terms)] = True
+        # 缺失名称的编码为 -1，正好取到末尾的 False
+        return hit[self._codes]
+
+    def rows(self, terms):
+        """企业名称包含任一关键词的行号（升序）"""
+        return np.flatnonzero(self.mask(terms))
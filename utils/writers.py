@@ -0,0 +1,171 @@
+"""指数结果的输出格式
+
+结果表原先通过 ``pd.ExcelWriter(engine='openpyxl')`` 写出：整本工作簿先在内存中
+建好再保存，数据量大时写文件比计算还慢。这里把输出拆成可替换的写出函数，每次
+运行按需选择：
+
+- ``xlsx``：openpyxl 只写模式，逐行写入临时文件，内存占用与行数无关；
+- ``parquet``：每张表一个 Parquet 文件（需要 pyarrow），适合程序读取；
+- ``csv``：每张表一个 UTF-8（带 BOM）CSV 文件。
+
+有多张表时，xlsx 写成同一工作簿中的多个工作表，parquet / csv 写到以结果名命名的
+目录中；只有一张表时直接写成单个文件。每张表可以是一个 DataFrame，也可以是逐块
+产出 DataFrame 的迭代器（流式模式）。写出函数返回每张表的行数、字节数和写出耗时，
+耗时只统计写出本身，不含产出数据块的计算时间。
+"""
+import os
+import time
+import zipfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 为可选依赖
+    pa = None
+    pq = None
+
+OUTPUT_FORMATS = ('xlsx', 'parquet', 'csv')
+
+# Excel 单个工作表最多 1048576 行（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+# 转换成 Excel 行时每批处理的行数
+_ROW_BATCH = 10000
+
+
+def _iter_frames(data):
+    """把 DataFrame 或数据块迭代器统一成数据块序列"""
+    if isinstance(data, pd.DataFrame):
+        yield data
+    else:
+        yield from data
+
+
+def _table_paths(stem, sheets, extension):
+    """多张表时写到 stem 目录下各自的文件，只有一张表时直接写成单个文件"""
+    if len(sheets) == 1:
+        return f'{stem}{extension}', [f'{stem}{extension}']
+    os.makedirs(stem, exist_ok=True)
+    return stem, [os.path.join(stem, f'{name}{extension}') for name, _ in sheets]
+
+
+def _excel_rows(frame):
+    """逐行产出可写入 openpyxl 的值，缺失值写成空单元格"""
+    for start in range(0, len(frame), _ROW_BATCH):
+        batch = frame.iloc[start:start + _ROW_BATCH].astype(object)
+        batch = batch.where(batch.notna(), None)
+        yield from batch.itertuples(index=False, name=None)
+
+
+def write_xlsx(stem, sheets):
+    """用 openpyxl 只写模式写出工作簿，各表的字节数取自 xlsx（zip）中对应的工作表条目"""
+    from openpyxl import Workbook
+
+    path = f'{stem}.xlsx'
+    workbook = Workbook(write_only=True)
+    stats = []
+    for name, data in sheets:
+        worksheet = workbook.create_sheet(title=name)
+        rows, seconds = 0, 0.0
+        for i, frame in enumerate(_iter_frames(data)):
+            rows += len(frame)
+            if rows >= EXCEL_MAX_ROWS:
+                raise ValueError(f'工作表 {name} 超过 Excel 的行数上限 {EXCEL_MAX_ROWS}，请改用 parquet 或 csv 格式')
+            start = time.perf_counter()
+            if i == 0:
+                worksheet.append([str(col) for col in frame.columns])
+            for row in _excel_rows(frame):
+                worksheet.append(row)
+            seconds += time.perf_counter() - start
+        stats.append({'sheet': name, 'rows': rows, 'bytes': 0, 'seconds': seconds})
+
+    start = time.perf_counter()
+    workbook.save(path)
+    save_seconds = time.perf_counter() - start
+    # 只写模式按创建顺序把工作表保存为 xl/worksheets/sheet1.xml、sheet2.xml ...
+    with zipfile.ZipFile(path) as archive:
+        for i, item in enumerate(stats, 1):
+            item['bytes'] = archive.getinfo(f'xl/worksheets/sheet{i}.xml').compress_size
+    # 共享字符串、样式等公共部分以及压缩打包的耗时单独列出
+    stats.append({'sheet': '（工作簿公共部分）', 'rows': None,
+                  'bytes': os.path.getsize(path) - sum(item['bytes'] for item in stats),
+                  'seconds': save_seconds})
+    return path, stats
+
+
+def write_parquet(stem, sheets):
+    """每张表写成一个 Parquet 文件，数据块依次追加为行组"""
+    if pq is None:
+        raise ValueError('写出 Parquet 格式需要安装 pyarrow')
+    output_path, paths = _table_paths(stem, sheets, '.parquet')
+    stats = []
+    for (name, data), path in zip(sheets, paths):
+        writer = None
+        rows, seconds = 0, 0.0
+        try:
+            for frame in _iter_frames(data):
+                start = time.perf_counter()
+                # 后续数据块按第一块的结构转换，某块整列缺失时类型仍保持一致
+                table = pa.Table.from_pandas(frame, schema=writer.schema if writer else None,
+                                             preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                seconds += time.perf_counter() - start
+                rows += len(frame)
+        finally:
+            if writer is not None:
+                start = time.perf_counter()
+                writer.close()
+                seconds += time.perf_counter() - start
+        size = os.path.getsize(path) if writer is not None else 0
+        stats.append({'sheet': name, 'rows': rows, 'bytes': size, 'seconds': seconds})
+    return output_path, stats
+
+
+def write_csv(stem, sheets):
+    """每张表写成一个 CSV 文件（UTF-8 带 BOM，Excel 可直接打开）"""
+    output_path, paths = _table_paths(stem, sheets, '.csv')
+    stats = []
+    for (name, data), path in zip(sheets, paths):
+        rows, seconds = 0, 0.0
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            for i, frame in enumerate(_iter_frames(data)):
+                start = time.perf_counter()
+                frame.to_csv(f, header=(i == 0), index=False)
+                seconds += time.perf_counter() - start
+                rows += len(frame)
+        stats.append({'sheet': name, 'rows': rows, 'bytes': os.path.getsize(path), 'seconds': seconds})
+    return output_path, stats
+
+
+# 输出格式 -> 写出函数；新增格式时在这里注册即可
+WRITERS = {
+    'xlsx': write_xlsx,
+    'parquet': write_parquet,
+    'csv': write_csv,
+}
+
+
+def write_tables(stem, sheets, output_format='xlsx'):
+    """按指定格式写出若干张表，返回 (输出路径, 每张表的统计)
+
+    stem 为不含扩展名的输出路径；sheets 为 (表名, DataFrame 或数据块迭代器) 的列表。
+    """
+    if output_format not in WRITERS:
+        raise ValueError(f'不支持的输出格式: {output_format}（可选: {", ".join(WRITERS)}）')
+    return WRITERS[output_format](stem, list(sheets))
+
+
+def format_stats(stats):
+    """把写出统计整理成便于打印的多行文本"""
+    lines = []
+    for item in stats:
+        rows = '' if item['rows'] is None else f'{item["rows"]} 行，'
+        lines.append(f'  {item["sheet"]}: {rows}{item["bytes"] / 1024:.1f} KB，{item["seconds"]:.2f} 秒')
+    total_bytes = sum(item['bytes'] for item in stats)
+    total_seconds = sum(item['seconds'] for item in stats)
+    lines.append(f'  合计: {total_bytes / 1024:.1f} KB，{total_seconds:.2f} 秒')
+    return '\n'.join(lines)